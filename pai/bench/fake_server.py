@@ -0,0 +1,208 @@
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+class FakeServerConfig:
+    """
+    Behaviour of the stand-in chat-completions server.
+    """
+    def __init__(self, ttft_ms: float = 200.0, tokens_per_second: float = 50.0, response_tokens: int = 40,
+                 tokens_per_chunk: int = 1, error_rate: float = 0.0, error_status: int = 500,
+                 retry_after: float = None, timestamp_tokens: bool = False, content: str = None,
+                 model_ttft_ms: dict = None):
+        self.ttft_ms = ttft_ms
+        # Per-model overrides of ttft_ms, e.g. to exercise hedged requests
+        self.model_ttft_ms = model_ttft_ms or {}
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.tokens_per_chunk = max(1, tokens_per_chunk)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        # Each streamed chunk carries its send time as "<t=...>", so clients can measure relay delay
+        self.timestamp_tokens = timestamp_tokens
+        self.content = content
+
+
+class FakeChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "PAIFakeLLM/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def config(self) -> FakeServerConfig:
+        return self.server.config
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self.send_json(400, {"error": {"message": "Invalid JSON"}})
+            return
+
+        self.server.request_count += 1
+        if self.config.error_rate and random.random() < self.config.error_rate:
+            headers = {"retry-after": str(self.config.retry_after)} if self.config.retry_after is not None else {}
+            self.send_json(self.config.error_status, {"error": {"message": "Injected failure"}}, headers)
+            return
+
+        model = body.get("model", "fake-model")
+        time.sleep(self.config.model_ttft_ms.get(model, self.config.ttft_ms) / 1000.0)
+        if body.get("stream"):
+            self.stream_response(model, body)
+        else:
+            self.complete_response(model)
+
+    def tokens(self):
+        if self.config.content is not None:
+            words = self.config.content.split(' ')
+            return [word + (' ' if i < len(words) - 1 else '') for i, word in enumerate(words)]
+        return [f"tok{i} " for i in range(self.config.response_tokens)]
+
+    def complete_response(self, model: str):
+        tokens = self.tokens()
+        # Generation time still applies when the answer is returned in one piece
+        time.sleep(len(tokens) / self.config.tokens_per_second if self.config.tokens_per_second else 0)
+        self.send_json(200, {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": len(tokens), "total_tokens": 10 + len(tokens)},
+        })
+
+    def stream_response(self, model: str, body: dict):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        tokens = self.tokens()
+        per_chunk = self.config.tokens_per_chunk
+        interval = per_chunk / self.config.tokens_per_second if self.config.tokens_per_second else 0
+        try:
+            for start in range(0, len(tokens), per_chunk):
+                if start and interval:
+                    time.sleep(interval)
+                text = "".join(tokens[start:start + per_chunk])
+                if self.config.timestamp_tokens:
+                    text = f"<t={time.time():.6f}>"
+                self.send_event({
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}],
+                })
+            if (body.get("stream_options") or {}).get("include_usage"):
+                self.send_event({
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [],
+                    "usage": {"prompt_tokens": 10, "completion_tokens": len(tokens), "total_tokens": 10 + len(tokens)},
+                })
+            self.send_chunk(b"data: [DONE]\n\n")
+            self.send_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled the stream (e.g. a hedged request that lost)
+            pass
+
+    def send_event(self, data: dict):
+        self.send_chunk(f"data: {json.dumps(data)}\n\n".encode('utf-8'))
+
+    def send_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def send_json(self, status: int, data: dict, headers: dict = None):
+        payload = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        try:
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up on the request (e.g. a hedged request that lost)
+            pass
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, address, config: FakeServerConfig):
+        super().__init__(address, FakeChatHandler)
+        self.config = config
+        self.request_count = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def start_server(config: FakeServerConfig = None, host: str = "127.0.0.1", port: int = 0) -> FakeLLMServer:
+    """
+    Starts the fake server on a background thread; port 0 picks a free port.
+    """
+    server = FakeLLMServer((host, port), config or FakeServerConfig())
+    threading.Thread(target=server.serve_forever, name="pai-fake-llm", daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible chat-completions stand-in for benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--ttft-ms", type=float, default=200.0, help="Delay before the first token.")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="Generation speed after the first token.")
+    parser.add_argument("--response-tokens", type=int, default=40, help="Tokens per answer.")
+    parser.add_argument("--tokens-per-chunk", type=int, default=1, help="Tokens bundled into each streamed chunk.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail.")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status of injected failures (e.g. 429).")
+    parser.add_argument("--retry-after", type=float, default=None, help="retry-after header sent with injected failures.")
+    parser.add_argument("--model-ttft", action="append", default=[], metavar="MODEL=MS",
+                        help="Delay before the first token for one model (repeatable).")
+    parser.add_argument("--content", default=None, help="Fixed answer text instead of generated tokens.")
+    parser.add_argument("--timestamp-tokens", action="store_true", help="Stream send timestamps instead of tokens.")
+    args = parser.parse_args()
+
+    config = FakeServerConfig(
+        ttft_ms=args.ttft_ms,
+        tokens_per_second=args.tokens_per_second,
+        response_tokens=args.response_tokens,
+        tokens_per_chunk=args.tokens_per_chunk,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        retry_after=args.retry_after,
+        timestamp_tokens=args.timestamp_tokens,
+        content=args.content,
+        model_ttft_ms={model: float(ms) for model, ms in (item.rsplit('=', 1) for item in args.model_ttft)},
+    )
+    server = FakeLLMServer((args.host, args.port), config)
+    print(f"Fake LLM server listening on {server.base_url} (set PAI_LLM_BASE_URL to use it)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import os
+import sys
+import json
+import math
+import argparse
+import tempfile
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PAI_CLI = os.path.join(REPO_ROOT, 'pai', 'pai.py')
+BUDGET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'importtime_budget.json')
+
+# Entry points measured: what the interpreter is asked to run after `python -X importtime`
+ENTRY_POINTS = {
+    "cli_help": [PAI_CLI],
+    "cli_list": [PAI_CLI, '--list'],
+    "cli_unknown_command": [PAI_CLI, 'no-such-skill'],
+    "skill_ask": ['-c', 'import pai.skills.ask'],
+    "skill_run_agent": ['-c', 'import pai.skills.run_agent'],
+    "skill_batch": ['-c', 'import pai.skills.batch'],
+    "skill_sharaba": ['-c', 'import pai.skills.sharaba'],
+    "skill_events": ['-c', 'import pai.skills.events'],
+    "skill_stats": ['-c', 'import pai.skills.stats'],
+    "daemon_client": ['-c', 'import pai.daemon'],
+}
+
+# Headroom applied by --update. Millisecond budgets are machine-dependent, so exceeding one
+# only warns unless --strict is given; the forbidden-module sets are what tests enforce.
+HEADROOM_FACTOR = 1.5
+HEADROOM_MS = 5.0
+
+def parse_importtime(stderr: str) -> dict:
+    """
+    Reads `-X importtime` output into {"modules": set of every module, "top": {module: cumulative ms}}.
+    """
+    modules = set()
+    top = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        try:
+            _, cumulative, name = line[len('import time:'):].split('|', 2)
+            cumulative_ms = int(cumulative) / 1000.0
+        except ValueError:
+            continue
+        # Nested imports are indented by two spaces per level after the single separator space
+        module = name.strip()
+        modules.add(module)
+        if len(name) - len(name.lstrip(' ')) == 1:
+            top[module] = top.get(module, 0.0) + cumulative_ms
+    return {"modules": modules, "top": top}
+
+def isolated_env(pai_dir: str) -> dict:
+    """
+    Environment for measuring: a throwaway PAI_DIR, no daemon and no API key.
+    """
+    env = dict(os.environ, PAI_DIR=pai_dir, PAI_NO_DAEMON='1')
+    env.pop('OPENROUTER_API_KEY', None)
+    return env
+
+def run_importtime(argv: list, env: dict) -> dict:
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + argv, env=env, cwd=REPO_ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=False)
+    return parse_importtime(result.stderr)
+
+def measure(argv: list, env: dict, repeat: int, baseline: set) -> dict:
+    """
+    Median import time (ms) of an entry point beyond what bare interpreter startup imports,
+    and every module it loaded.
+    """
+    samples = []
+    modules = set()
+    for _ in range(repeat):
+        parsed = run_importtime(argv, env)
+        modules |= parsed["modules"]
+        samples.append(sum(ms for module, ms in parsed["top"].items() if module not in baseline))
+    samples.sort()
+    return {"import_ms": round(samples[len(samples) // 2], 2), "modules": modules}
+
+def load_budgets() -> dict:
+    try:
+        with open(BUDGET_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def forbidden_loaded(modules: set, forbidden: list) -> list:
+    """
+    The forbidden modules (or packages) among `modules`.
+    """
+    return sorted(module for module in forbidden
+                  if any(m == module or m.startswith(module + '.') for m in modules))
+
+def check(results: dict, budgets: dict) -> tuple:
+    """
+    Returns (failures, warnings): entry points importing a module they must not, and
+    entry points over their millisecond budget.
+    """
+    failures = []
+    warnings = []
+    for name, result in results.items():
+        budget = budgets.get(name, {})
+        if budget.get("budget_ms") is not None and result["import_ms"] > budget["budget_ms"]:
+            warnings.append(f"{name}: imports take {result['import_ms']:.1f}ms, budget is {budget['budget_ms']:.1f}ms")
+        loaded = forbidden_loaded(result["modules"], budget.get("forbidden", []))
+        if loaded:
+            failures.append(f"{name}: imports {', '.join(loaded)} at startup")
+    return failures, warnings
+
+def main():
+    parser = argparse.ArgumentParser(description="Checks the import-time budget of each PAI entry point (via -X importtime).")
+    parser.add_argument("--only", default=None, help=f"Comma-separated subset of: {', '.join(ENTRY_POINTS)}.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per entry point; the median is compared.")
+    parser.add_argument("--update", action="store_true", help="Rewrite the budgets from this run's measurements.")
+    parser.add_argument("--json", action="store_true", help="Print the measurements as JSON.")
+    parser.add_argument("--strict", action="store_true", help="Fail, rather than warn, when a millisecond budget is exceeded.")
+    args = parser.parse_args()
+
+    names = args.only.split(',') if args.only else list(ENTRY_POINTS)
+    unknown = [name for name in names if name not in ENTRY_POINTS]
+    if unknown:
+        print(f"Error: Unknown entry points: {', '.join(unknown)}", file=sys.stderr)
+        sys.exit(2)
+
+    with tempfile.TemporaryDirectory(prefix='pai-importtime-') as pai_dir:
+        env = isolated_env(pai_dir)
+        # First run compiles bytecode and writes the prompt registry snapshot
+        for name in names:
+            run_importtime(ENTRY_POINTS[name], env)
+        baseline = run_importtime(['-c', 'pass'], env)["modules"]
+        results = {name: measure(ENTRY_POINTS[name], env, max(1, args.repeat), baseline) for name in names}
+
+    budgets = load_budgets()
+    if args.update:
+        for name, result in results.items():
+            entry = budgets.setdefault(name, {"forbidden": []})
+            entry["budget_ms"] = math.ceil(result["import_ms"] * HEADROOM_FACTOR + HEADROOM_MS)
+        with open(BUDGET_PATH, 'w', encoding='utf-8') as f:
+            json.dump(budgets, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Budgets written to {BUDGET_PATH}")
+
+    if args.json:
+        print(json.dumps({name: {"import_ms": result["import_ms"], "module_count": len(result["modules"])}
+                          for name, result in results.items()}, indent=2))
+    else:
+        print(f"{'entry point':<22} {'imports':>10} {'budget':>10} {'modules':>8}")
+        for name, result in results.items():
+            budget = budgets.get(name, {}).get("budget_ms")
+            budget_text = f"{budget:.1f}" if budget is not None else "-"
+            print(f"{name:<22} {result['import_ms']:>10.1f} {budget_text:>10} {len(result['modules']):>8}")
+
+    failures, warnings = check(results, budgets)
+    if args.strict:
+        failures, warnings = failures + warnings, []
+    for warning in warnings:
+        print(f"WARN {warning}", file=sys.stderr)
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
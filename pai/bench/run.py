@@ -0,0 +1,328 @@
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+from .fake_server import FakeServerConfig, start_server
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PAI_CLI = os.path.join(REPO_ROOT, 'pai', 'pai.py')
+TIMESTAMP_TOKEN = re.compile(rb"<t=(\d+\.\d+)>")
+
+BENCHMARKS = ("cold_start", "dispatch", "emitter", "stream_relay", "throughput")
+
+def summarize(samples: list) -> dict:
+    """
+    Reduces timing samples (ms) to count/min/p50/p95/max/mean.
+    """
+    if not samples:
+        return {"count": 0}
+    values = sorted(samples)
+    return {
+        "count": len(values),
+        "min": round(values[0], 3),
+        "p50": round(values[len(values) // 2], 3),
+        "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+        "max": round(values[-1], 3),
+        "mean": round(sum(values) / len(values), 3),
+    }
+
+def run_timed(argv: list, env: dict) -> float:
+    """
+    Runs a command to completion and returns its wall time in ms.
+    """
+    start = time.perf_counter()
+    subprocess.run(argv, env=env, cwd=REPO_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+    return (time.perf_counter() - start) * 1000
+
+def bench_cold_start(env: dict, repeat: int) -> dict:
+    """
+    Interpreter startup alone versus `pai --list`, which loads the CLI but runs no skill.
+    """
+    return {
+        "python_startup_ms": summarize([run_timed([sys.executable, '-c', 'pass'], env) for _ in range(repeat)]),
+        "pai_list_ms": summarize([run_timed([sys.executable, PAI_CLI, '--list'], env) for _ in range(repeat)]),
+    }
+
+def _wait_for_socket(path: str, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if os.path.exists(path):
+            return True
+        time.sleep(0.05)
+    return False
+
+def bench_dispatch(env: dict, repeat: int) -> dict:
+    """
+    Cost of reaching a skill through pai.py (subprocess and daemon paths) versus running it directly.
+    Uses `events --count` against an empty history, so the skill itself does almost nothing.
+    """
+    direct = [sys.executable, '-m', 'pai.skills.events', '--count']
+    via_cli = [sys.executable, PAI_CLI, 'events', '--count']
+    results = {
+        "direct_ms": summarize([run_timed(direct, env) for _ in range(repeat)]),
+        "subprocess_ms": summarize([run_timed(via_cli, dict(env, PAI_NO_DAEMON='1')) for _ in range(repeat)]),
+    }
+
+    socket_path = os.path.join(env['PAI_DIR'], 'run', 'bench-daemon.sock')
+    daemon_env = dict(env, PAI_DAEMON_SOCKET=socket_path)
+    daemon = subprocess.Popen([sys.executable, '-m', 'pai.daemon', 'serve'], env=daemon_env, cwd=REPO_ROOT,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if _wait_for_socket(socket_path):
+            results["daemon_ms"] = summarize([run_timed(via_cli, daemon_env) for _ in range(repeat)])
+    finally:
+        daemon.terminate()
+        daemon.wait()
+
+    direct_p50 = results["direct_ms"].get("p50", 0)
+    results["subprocess_overhead_ms"] = round(results["subprocess_ms"].get("p50", 0) - direct_p50, 3)
+    if "daemon_ms" in results:
+        results["daemon_overhead_ms"] = round(results["daemon_ms"].get("p50", 0) - direct_p50, 3)
+    return results
+
+def bench_emitter(env: dict, events: int = 5000) -> dict:
+    """
+    Caller-side cost of emit_event and the time to flush the queue, per durability policy.
+    Runs in a child so each policy gets a fresh writer and PAI_DIR.
+    """
+    script = (
+        "import time, json\n"
+        "from pai.emitter import create_event, emit_event, flush_events\n"
+        f"n = {events}\n"
+        "event = create_event('pai-bench', 'BenchEvent', {'i': 0}, session_id='bench')\n"
+        "start = time.perf_counter()\n"
+        "for i in range(n):\n"
+        "    emit_event(event)\n"
+        "emitted = time.perf_counter()\n"
+        "flush_events(timeout=60)\n"
+        "done = time.perf_counter()\n"
+        "print(json.dumps({'emit_us_per_event': (emitted - start) / n * 1e6, 'flush_ms': (done - emitted) * 1000,"
+        " 'total_us_per_event': (done - start) / n * 1e6}))\n"
+    )
+    results = {}
+    for policy in ("none", "flush", "fsync"):
+        policy_env = dict(env, PAI_EMITTER_DURABILITY=policy)
+        output = subprocess.run([sys.executable, '-c', script], env=policy_env, cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=False)
+        try:
+            results[policy] = {key: round(value, 3) for key, value in json.loads(output.stdout).items()}
+        except ValueError:
+            results[policy] = {"error": output.stderr.strip()[-500:]}
+    return results
+
+def _measure_stream(argv: list, env: dict) -> dict:
+    """
+    Reads a child's stdout in raw chunks and compares each timestamp token's send time with its arrival.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(argv, env=env, cwd=REPO_ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    delays = []
+    first_byte_ms = None
+    buffer = b""
+    while True:
+        data = os.read(process.stdout.fileno(), 65536)
+        if not data:
+            break
+        arrived = time.time()
+        if first_byte_ms is None:
+            first_byte_ms = (time.perf_counter() - start) * 1000
+        buffer += data
+        for match in TIMESTAMP_TOKEN.finditer(buffer):
+            delays.append((arrived - float(match.group(1))) * 1000)
+        buffer = buffer[buffer.rfind(b">") + 1:] if b">" in buffer else buffer
+    process.wait()
+    return {"first_byte_ms": round(first_byte_ms or 0, 3), "chunk_delay_ms": summarize(delays)}
+
+def bench_stream_relay(env: dict, repeat: int) -> dict:
+    """
+    Delay between the fake server sending a streamed chunk and it reaching our stdout,
+    with the skill run directly and through pai.py.
+    """
+    server = start_server(FakeServerConfig(ttft_ms=50, tokens_per_second=50, response_tokens=20, timestamp_tokens=True))
+    stream_env = dict(env, PAI_LLM_BASE_URL=server.base_url, PAI_NO_DAEMON='1')
+    prompt = ['--stream', '--no-validate', 'benchmark']
+    try:
+        direct = [_measure_stream([sys.executable, '-m', 'pai.skills.ask'] + prompt, stream_env) for _ in range(repeat)]
+        relayed = [_measure_stream([sys.executable, PAI_CLI, 'ask'] + prompt, stream_env) for _ in range(repeat)]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    def merge(runs):
+        return {
+            "first_byte_ms": summarize([run["first_byte_ms"] for run in runs]),
+            "chunk_delay_p50_ms": summarize([run["chunk_delay_ms"]["p50"] for run in runs if run["chunk_delay_ms"]["count"]]),
+        }
+    return {"direct": merge(direct), "via_cli": merge(relayed)}
+
+def _batch_outcome(output_path: str) -> dict:
+    """
+    Counts the ok and failed records of a batch output file, keeping the first error seen.
+    """
+    outcome = {"ok": 0, "errors": 0}
+    try:
+        with open(output_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("status") == "ok":
+                    outcome["ok"] += 1
+                else:
+                    outcome["errors"] += 1
+                    outcome.setdefault("first_error", str(record.get("error") or record.get("answer"))[:300])
+    except FileNotFoundError:
+        pass
+    return outcome
+
+def bench_throughput(env: dict, concurrency_levels: list, prompts: int) -> dict:
+    """
+    End-to-end prompts/second of `pai batch` for ask and run_agent at several concurrency levels.
+    """
+    server = start_server(FakeServerConfig(ttft_ms=100, tokens_per_second=200, response_tokens=20, content="VALID"))
+    work_dir = tempfile.mkdtemp(prefix="pai-bench-")
+    agents_dir = os.path.join(work_dir, 'agents')
+    os.makedirs(agents_dir)
+    with open(os.path.join(agents_dir, 'bench.md'), 'w', encoding='utf-8') as f:
+        f.write("---\nname: bench\ndescription: Benchmark agent\n---\nYou answer benchmark prompts.\n")
+    input_path = os.path.join(work_dir, 'prompts.jsonl')
+    with open(input_path, 'w', encoding='utf-8') as f:
+        for i in range(prompts):
+            f.write(json.dumps({"id": f"p{i}", "prompt": f"Benchmark prompt {i}"}) + "\n")
+
+    results = {}
+    try:
+        for skill, extra in (("ask", []), ("run_agent", ["--agent", "bench"])):
+            results[skill] = {}
+            for level in concurrency_levels:
+                output_path = os.path.join(work_dir, f"{skill}-{level}.out.jsonl")
+                level_env = dict(env, PAI_LLM_BASE_URL=server.base_url, PAI_AGENTS_DIR=agents_dir,
+                                 PAI_LLM_MAX_CONCURRENCY=str(level))
+                argv = [sys.executable, '-m', 'pai.skills.batch', skill, input_path, '-o', output_path,
+                        '--workers', str(level)] + extra
+                start = time.perf_counter()
+                process = subprocess.run(argv, env=level_env, cwd=REPO_ROOT, stdout=subprocess.DEVNULL,
+                                         stderr=subprocess.PIPE, text=True, check=False)
+                seconds = time.perf_counter() - start
+                outcome = _batch_outcome(output_path)
+                # Only answered prompts count towards throughput; failures are reported, not hidden
+                result = {
+                    "seconds": round(seconds, 3),
+                    "prompts_per_second": round(outcome["ok"] / seconds, 3),
+                    "ok": outcome["ok"],
+                    "errors": outcome["errors"],
+                    "exit_code": process.returncode,
+                }
+                if process.returncode != 0 or outcome["ok"] != prompts:
+                    result["error"] = outcome.get("first_error") or process.stderr.strip()[-500:]
+                    print(f"Warning: {skill} batch at concurrency {level}: {outcome['ok']}/{prompts} ok, "
+                          f"exit code {process.returncode}: {result['error']}", file=sys.stderr)
+                results[skill][str(level)] = result
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+def compare(baseline_path: str, current: dict):
+    """
+    Prints every numeric metric next to the baseline run's value.
+    """
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    old = flatten(baseline.get("results", {}))
+    new = flatten(current.get("results", {}))
+    print(f"\nComparison against {baseline.get('revision')} ({baseline_path})")
+    print(f"  {'metric':<60} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name in sorted(set(old) & set(new)):
+        if name.endswith(".count"):
+            continue
+        change = f"{(new[name] - old[name]) / old[name] * 100:+.1f}%" if old[name] else "n/a"
+        print(f"  {name:<60} {old[name]:>12.3f} {new[name]:>12.3f} {change:>9}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline PAI benchmark suite (uses a local fake LLM server).")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}.")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions for process-level benchmarks.")
+    parser.add_argument("--concurrency", default="1,4,16", help="Concurrency levels for the throughput benchmark.")
+    parser.add_argument("--prompts", type=int, default=32, help="Prompts per throughput run.")
+    parser.add_argument("--output", default=None, help="Where to save results (default: $PAI_DIR/bench/<time>_<rev>.json).")
+    parser.add_argument("--compare", default=None, help="Earlier results file to compare against.")
+    args = parser.parse_args()
+
+    selected = [name.strip() for name in args.only.split(',') if name.strip()]
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        print(f"Error: Unknown benchmark(s): {', '.join(sorted(unknown))}", file=sys.stderr)
+        sys.exit(1)
+
+    real_pai_dir = os.environ.get('PAI_DIR', os.path.join(os.path.expanduser('~'), '.claude'))
+    bench_pai_dir = tempfile.mkdtemp(prefix="pai-bench-home-")
+    # Everything runs against a throwaway PAI_DIR and a fake key, never the real history or API
+    env = dict(os.environ, PAI_DIR=bench_pai_dir, OPENROUTER_API_KEY='bench', PAI_LLM_CACHE='0')
+    env.pop('PAI_DAEMON_SOCKET', None)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [REPO_ROOT, env.get('PYTHONPATH')]))
+
+    results = {}
+    try:
+        for name in selected:
+            print(f"Running {name}...", file=sys.stderr)
+            if name == "cold_start":
+                results[name] = bench_cold_start(env, args.repeat)
+            elif name == "dispatch":
+                results[name] = bench_dispatch(env, args.repeat)
+            elif name == "emitter":
+                results[name] = bench_emitter(env)
+            elif name == "stream_relay":
+                results[name] = bench_stream_relay(env, args.repeat)
+            elif name == "throughput":
+                levels = [int(level) for level in args.concurrency.split(',') if level.strip()]
+                results[name] = bench_throughput(env, levels, args.prompts)
+    finally:
+        shutil.rmtree(bench_pai_dir, ignore_errors=True)
+
+    report = {
+        "revision": git_revision(),
+        "created": datetime.now().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    output_path = args.output or os.path.join(
+        real_pai_dir, 'bench', f"{datetime.now().strftime('%Y%m%d-%H%M%S')}_{report['revision']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(results, indent=2))
+    print(f"\nResults saved to {output_path}", file=sys.stderr)
+    if args.compare:
+        compare(args.compare, report)
+
+if __name__ == "__main__":
+    main()
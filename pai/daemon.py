@@ -0,0 +1,374 @@
+import os
+import sys
+import io
+import json
+import time
+import signal
+import socket
+import struct
+import argparse
+import importlib
+import threading
+import contextlib
+import socketserver
+
+# Frames exchanged over the socket: a one-byte tag, a 4-byte big-endian length and the payload.
+FRAME_HEADER = struct.Struct('>cI')
+STDOUT_FRAME = b'O'
+STDERR_FRAME = b'E'
+EXIT_FRAME = b'X'
+# Sent first by a worker running a skill, carrying its pid so the client can forward signals to it
+PID_FRAME = b'P'
+
+# Signals the CLI passes on to the process actually running the skill
+FORWARDED_SIGNALS = (signal.SIGINT, signal.SIGTERM, signal.SIGHUP)
+
+def get_socket_path() -> str:
+    """
+    Determines the path of the daemon's Unix socket.
+    """
+    socket_path = os.environ.get('PAI_DAEMON_SOCKET')
+    if socket_path:
+        return socket_path
+    pai_dir = os.environ.get('PAI_DIR', os.path.join(os.path.expanduser('~'), '.claude'))
+    return os.path.join(pai_dir, 'run', 'pai-daemon.sock')
+
+def send_frame(sock: socket.socket, tag: bytes, payload: bytes):
+    """
+    Sends a single tagged frame over the socket.
+    """
+    sock.sendall(FRAME_HEADER.pack(tag, len(payload)) + payload)
+
+def recv_exactly(sock: socket.socket, size: int) -> bytes:
+    """
+    Reads exactly `size` bytes from the socket, or fewer if the peer hangs up.
+    """
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+def connect(socket_path: str = None):
+    """
+    Connects to a running daemon. Returns None when no daemon is listening.
+    """
+    socket_path = socket_path or get_socket_path()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+@contextlib.contextmanager
+def forward_signals(send_signal, skip: tuple = ()):
+    """
+    While the block runs, hands SIGINT/SIGTERM/SIGHUP received by this process to
+    `send_signal(signum)` instead of acting on them. Signals in `skip` keep their handlers.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def handler(signum, frame):
+        try:
+            send_signal(signum)
+        except (ProcessLookupError, OSError):
+            pass
+
+    previous = {sig: signal.signal(sig, handler) for sig in FORWARDED_SIGNALS if sig not in skip}
+    try:
+        yield
+    finally:
+        for sig, old_handler in previous.items():
+            signal.signal(sig, old_handler)
+
+def exit_code_from_status(returncode: int) -> int:
+    """
+    Maps a child killed by a signal (negative returncode) to the shell's 128+N convention.
+    """
+    return 128 - returncode if returncode < 0 else returncode
+
+def write_raw(stream, data: bytes):
+    """
+    Writes bytes straight to a text stream's underlying buffer, after anything already queued on it.
+    """
+    stream.flush()
+    stream.buffer.write(data)
+    stream.buffer.flush()
+
+def record_relay(timings: dict, received: float, size: int):
+    """
+    Accounts one relayed chunk: the delay between it becoming readable and being written out.
+    """
+    timings.setdefault("relay_ms", []).append((time.perf_counter() - received) * 1000)
+    timings["relay_bytes"] = timings.get("relay_bytes", 0) + size
+
+def run_in_daemon(command: str, command_args: list, timings: dict = None):
+    """
+    Forwards a skill invocation to the daemon and relays its output.
+    Returns the skill's exit code, or None if no daemon is running.
+    If given, `timings` receives perf_counter stamps for "spawned" and "first_output", and relay delays.
+    Signals received meanwhile are forwarded to the daemon worker running the skill.
+    """
+    timings = timings if timings is not None else {}
+    if os.environ.get('PAI_NO_DAEMON'):
+        return None
+
+    sock = connect()
+    if sock is None:
+        return None
+    timings["spawned"] = time.perf_counter()
+
+    request = {
+        "op": "run",
+        "command": command,
+        "args": command_args,
+        "env": dict(os.environ),
+        "cwd": os.getcwd(),
+    }
+    streams = {STDOUT_FRAME: sys.stdout, STDERR_FRAME: sys.stderr}
+    worker = {}
+
+    def send_signal(signum):
+        if worker.get("pid"):
+            os.kill(worker["pid"], signum)
+
+    try:
+        sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        with forward_signals(send_signal):
+            while True:
+                header = recv_exactly(sock, FRAME_HEADER.size)
+                if len(header) < FRAME_HEADER.size:
+                    print("Error: PAI daemon closed the connection unexpectedly.", file=sys.stderr)
+                    return 1
+                tag, size = FRAME_HEADER.unpack(header)
+                payload = recv_exactly(sock, size)
+                received = time.perf_counter()
+                if tag == EXIT_FRAME:
+                    return struct.unpack('>i', payload)[0]
+                if tag == PID_FRAME:
+                    worker["pid"] = struct.unpack('>i', payload)[0]
+                    continue
+                stream = streams.get(tag)
+                if tag == STDOUT_FRAME:
+                    timings.setdefault("first_output", received)
+                if stream is not None:
+                    write_raw(stream, payload)
+                    record_relay(timings, received, len(payload))
+    finally:
+        sock.close()
+
+
+class _FrameWriter(io.RawIOBase):
+    """
+    A binary stream that forwards everything written to it as framed socket messages.
+    """
+    def __init__(self, sock: socket.socket, tag: bytes):
+        super().__init__()
+        self.sock = sock
+        self.tag = tag
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        if data:
+            send_frame(self.sock, self.tag, data)
+        return len(data)
+
+
+def _exit_on_signal(signum, frame):
+    raise SystemExit(128 + signum)
+
+
+class _SkillRequestHandler(socketserver.StreamRequestHandler):
+    """
+    Handles one client connection. Runs in a forked child of the daemon, so the
+    skill inherits every module the daemon already imported.
+    """
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            return
+
+        op = request.get("op", "run")
+        if op == "shutdown":
+            os.kill(os.getppid(), signal.SIGTERM)
+            self.send_exit(0)
+        elif op == "ping":
+            self.send_exit(0)
+        elif op == "run":
+            self.send_exit(self.run_skill(request))
+
+    def send_exit(self, code: int):
+        send_frame(self.request, EXIT_FRAME, struct.pack('>i', code))
+
+    def run_skill(self, request: dict) -> int:
+        command = request.get("command", "")
+        # The client forwards SIGINT/SIGTERM here; the forked worker inherits the daemon's own handlers
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGTERM, _exit_on_signal)
+        signal.signal(signal.SIGHUP, _exit_on_signal)
+        send_frame(self.request, PID_FRAME, struct.pack('>i', os.getpid()))
+
+        os.environ.clear()
+        os.environ.update(request.get("env", {}))
+        try:
+            os.chdir(request.get("cwd") or os.getcwd())
+        except OSError:
+            pass
+
+        sys.stdout = io.TextIOWrapper(_FrameWriter(self.request, STDOUT_FRAME), encoding='utf-8', write_through=True)
+        sys.stderr = io.TextIOWrapper(_FrameWriter(self.request, STDERR_FRAME), encoding='utf-8', write_through=True)
+        sys.argv = [f"pai.skills.{command}"] + list(request.get("args", []))
+
+        exit_code = 0
+        try:
+            module = importlib.import_module(f"pai.skills.{command}")
+            module.main()
+        except SystemExit as e:
+            if e.code is None:
+                exit_code = 0
+            elif isinstance(e.code, int):
+                exit_code = e.code
+            else:
+                print(e.code, file=sys.stderr)
+                exit_code = 1
+        except KeyboardInterrupt:
+            exit_code = 128 + signal.SIGINT
+        except Exception:
+            import traceback
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            # Forked children leave via os._exit, which skips the atexit flushes and thread joins
+            router = sys.modules.get("pai.llm_router")
+            if router is not None:
+                router.flush_calls()
+            emitter = sys.modules.get("pai.emitter")
+            if emitter is not None:
+                emitter.flush_events()
+        return exit_code
+
+
+class PAIDaemonServer(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+    """
+    Unix socket server that forks a warm child per skill invocation.
+    """
+    block_on_close = False
+
+
+def preload_skills():
+    """
+    Imports the LLM client and every skill module up front so forked children start warm.
+    Modules that defer heavy imports to first use can expose a preload() hook for this.
+    Each request still gets a fresh event loop and LLM connection: neither survives fork,
+    so keep-alive connections are only reused within one skill run.
+    """
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if repo_root not in sys.path:
+        sys.path.insert(0, repo_root)
+
+    for module_name in ["pai.llm_utils"]:
+        try:
+            module = importlib.import_module(module_name)
+            if hasattr(module, "preload"):
+                module.preload()
+        except Exception as e:
+            print(f"Warning: Could not preload '{module_name}': {e}", file=sys.stderr)
+
+    skills_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'skills')
+    for filename in sorted(os.listdir(skills_dir)):
+        if not filename.endswith('.py') or filename.startswith('_'):
+            continue
+        skill_name = filename[:-3]
+        try:
+            module = importlib.import_module(f"pai.skills.{skill_name}")
+            if hasattr(module, "preload"):
+                module.preload()
+        except Exception as e:
+            # A skill with missing optional dependencies simply gets imported in the child instead.
+            print(f"Warning: Could not preload skill '{skill_name}': {e}", file=sys.stderr)
+
+def serve(socket_path: str):
+    """
+    Runs the daemon in the foreground until it receives SIGTERM or SIGINT.
+    """
+    existing = connect(socket_path)
+    if existing is not None:
+        existing.close()
+        print(f"Error: A PAI daemon is already listening on {socket_path}.", file=sys.stderr)
+        sys.exit(1)
+    if os.path.exists(socket_path):
+        # Stale socket left behind by a daemon that did not shut down cleanly.
+        os.remove(socket_path)
+    os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+
+    preload_skills()
+
+    def handle_sigterm(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    server = PAIDaemonServer(socket_path, _SkillRequestHandler)
+    os.chmod(socket_path, 0o600)
+    print(f"PAI daemon listening on {socket_path}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+def send_control(op: str, socket_path: str) -> bool:
+    """
+    Sends a control operation ("ping" or "shutdown") to the daemon.
+    """
+    sock = connect(socket_path)
+    if sock is None:
+        return False
+    try:
+        sock.sendall(json.dumps({"op": op}).encode('utf-8') + b'\n')
+        return len(recv_exactly(sock, FRAME_HEADER.size)) == FRAME_HEADER.size
+    finally:
+        sock.close()
+
+def main():
+    """
+    Entry point for managing the PAI daemon.
+    """
+    parser = argparse.ArgumentParser(description="Run the warm PAI skill daemon.")
+    parser.add_argument("action", nargs='?', default="serve", choices=["serve", "stop", "status"], help="What to do with the daemon.")
+    parser.add_argument("--socket", default=None, help="Path of the Unix socket to use.")
+    args = parser.parse_args()
+
+    socket_path = args.socket or get_socket_path()
+
+    if args.action == "serve":
+        serve(socket_path)
+    elif args.action == "stop":
+        if not send_control("shutdown", socket_path):
+            print("No PAI daemon is running.", file=sys.stderr)
+            sys.exit(1)
+        print("PAI daemon stopped.")
+    elif args.action == "status":
+        if send_control("ping", socket_path):
+            print(f"PAI daemon is running on {socket_path}.")
+        else:
+            print("No PAI daemon is running.")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
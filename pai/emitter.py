@@ -4,14 +4,36 @@ import time
 from datetime import datetime
 import uuid
 import sys
+import queue
+import atexit
+import threading
 
-def get_log_file_path():
+# Durability policies for the background writer:
+#   none  - buffer up to PAI_EMITTER_BATCH_SIZE events / PAI_EMITTER_BATCH_MS before writing
+#   flush - write whatever is queued as soon as the writer wakes up
+#   fsync - like flush, and fsync every PAI_EMITTER_SYNC_EVERY events or PAI_EMITTER_SYNC_MS
+DURABILITY_POLICIES = ("none", "flush", "fsync")
+
+def get_log_root() -> str:
     """
-    Determines the path to today's event log file.
+    Determines the directory that holds the per-month event log directories.
     """
     pai_dir = os.environ.get('PAI_DIR', os.path.join(os.path.expanduser('~'), '.claude'))
-    now = datetime.now()
-    month_dir = os.path.join(pai_dir, 'history', 'raw-outputs', now.strftime('%Y-%m'))
+    return os.path.join(pai_dir, 'history', 'raw-outputs')
+
+def get_log_dir(now: datetime = None) -> str:
+    """
+    Determines the month directory that holds the event logs for `now`.
+    """
+    now = now or datetime.now()
+    return os.path.join(get_log_root(), now.strftime('%Y-%m'))
+
+def get_log_file_path(now: datetime = None):
+    """
+    Determines the path to today's event log file.
+    """
+    now = now or datetime.now()
+    month_dir = get_log_dir(now)
     os.makedirs(month_dir, exist_ok=True)
     return os.path.join(month_dir, f"{now.strftime('%Y-%m-%d')}_all-events.jsonl")
 
@@ -32,17 +54,191 @@ def create_event(source_app: str, hook_event_type: str, payload: dict, session_i
         "timestamp": int(time.time()),
     }
 
+
+class EventWriter:
+    """
+    Background writer that appends queued events to the daily JSONL file.
+
+    The day's file is kept open with O_APPEND and each batch goes out in a single
+    os.write, so lines from concurrent pai processes never interleave.
+    """
+    def __init__(self, durability: str = None, batch_size: int = None, batch_ms: int = None,
+                 sync_every: int = None, sync_ms: int = None):
+        self.durability = durability or os.environ.get('PAI_EMITTER_DURABILITY', 'flush')
+        if self.durability not in DURABILITY_POLICIES:
+            print(f"Warning: Unknown emitter durability '{self.durability}', using 'flush'.", file=sys.stderr)
+            self.durability = 'flush'
+        self.batch_size = batch_size or int(os.environ.get('PAI_EMITTER_BATCH_SIZE', '256'))
+        self.batch_ms = batch_ms or int(os.environ.get('PAI_EMITTER_BATCH_MS', '200'))
+        self.sync_every = sync_every or int(os.environ.get('PAI_EMITTER_SYNC_EVERY', '1'))
+        self.sync_ms = sync_ms or int(os.environ.get('PAI_EMITTER_SYNC_MS', '1000'))
+
+        self._queue = queue.Queue()
+        self._fd = None
+        self._day = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="pai-emitter", daemon=True)
+        self._thread.start()
+
+    def put(self, event: dict):
+        self._queue.put(event)
+
+    def flush(self, timeout: float = 5.0):
+        """
+        Blocks until every event queued so far has been written.
+        """
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self, timeout: float = 5.0):
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        pending = []
+        deadline = None
+        while True:
+            # Wake up for whichever comes first: the batch interval or the fsync deadline
+            wakeups = [t for t in (deadline, self._sync_deadline()) if t is not None]
+            timeout = max(0.0, min(wakeups) - time.monotonic()) if wakeups else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                if pending and time.monotonic() >= deadline:
+                    # Batch interval elapsed without reaching the batch size
+                    self._write(pending)
+                    pending = []
+                    deadline = None
+                self._sync_if_due()
+                continue
+
+            waiters = []
+            stop = False
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    pending.append(item)
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if pending and deadline is None:
+                deadline = time.monotonic() + self.batch_ms / 1000.0
+            if stop or waiters or self.durability != 'none' or len(pending) >= self.batch_size:
+                self._write(pending)
+                pending = []
+            if not pending:
+                deadline = None
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                self._close_file()
+                return
+
+    def _open_for_today(self):
+        today = datetime.now()
+        day = today.strftime('%Y-%m-%d')
+        if self._fd is not None and day == self._day:
+            return self._fd
+        # Midnight rollover (or first write): switch to the new day's file
+        self._close_file()
+        self._fd = os.open(get_log_file_path(today), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._day = day
+        return self._fd
+
+    def _close_file(self):
+        if self._fd is not None:
+            if self.durability == 'fsync' and self._unsynced:
+                os.fsync(self._fd)
+                self._unsynced = 0
+            os.close(self._fd)
+            self._fd = None
+
+    def _write(self, events: list):
+        if not events:
+            return
+        try:
+            fd = self._open_for_today()
+            data = ''.join(json.dumps(event) + '\n' for event in events).encode('utf-8')
+            while data:
+                written = os.write(fd, data)
+                data = data[written:]
+            if self.durability == 'fsync':
+                if not self._unsynced:
+                    self._last_sync = time.monotonic()
+                self._unsynced += len(events)
+                self._sync_if_due()
+        except Exception as e:
+            # In a real-world application, we might want to handle this more gracefully.
+            print(f"Error emitting event: {e}", file=sys.stderr)
+
+    def _sync_deadline(self):
+        """
+        When written-but-unsynced events must reach the disk at the latest, or None if there are none.
+        """
+        if self.durability != 'fsync' or not self._unsynced or self._fd is None:
+            return None
+        return self._last_sync + self.sync_ms / 1000.0
+
+    def _sync_if_due(self):
+        deadline = self._sync_deadline()
+        if deadline is None:
+            return
+        now = time.monotonic()
+        if self._unsynced >= self.sync_every or now >= deadline:
+            try:
+                os.fsync(self._fd)
+            except OSError as e:
+                print(f"Error syncing events: {e}", file=sys.stderr)
+            self._unsynced = 0
+            self._last_sync = now
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_writer() -> EventWriter:
+    """
+    Returns the process-wide event writer, starting it on first use.
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = EventWriter()
+        return _writer
+
 def emit_event(event: dict):
     """
-    Appends an event to the appropriate log file.
+    Queues an event to be appended to the appropriate log file.
+    """
+    get_writer().put(event)
+
+def flush_events(timeout: float = 5.0):
     """
-    log_file = get_log_file_path()
-    try:
-        with open(log_file, 'a') as f:
-            f.write(json.dumps(event) + '\n')
-    except Exception as e:
-        # In a real-world application, we might want to handle this more gracefully.
-        print(f"Error emitting event: {e}", file=sys.stderr)
+    Blocks until all events emitted so far are on disk.
+    """
+    if _writer is not None:
+        _writer.flush(timeout)
+
+def _shutdown_writer():
+    if _writer is not None:
+        _writer.close()
+
+def _reset_after_fork():
+    # The writer thread does not survive fork(); children start their own on first emit
+    global _writer, _writer_lock
+    _writer = None
+    _writer_lock = threading.Lock()
+
+atexit.register(_shutdown_writer)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
 
 if __name__ == '__main__':
     # Example usage for testing
@@ -52,4 +248,5 @@ if __name__ == '__main__':
         payload={"message": "This is a test event from emitter.py"}
     )
     emit_event(test_event)
+    flush_events()
     print(f"Emitted test event to {get_log_file_path()}")
@@ -0,0 +1,320 @@
+import os
+import re
+import sys
+import json
+import mmap
+import time
+import fcntl
+from datetime import datetime
+
+INDEX_VERSION = 1
+# Sidecar index: a header line, then one line per update holding the entries it added
+INDEX_SUFFIX = ".idx"
+MANIFEST_NAME = "events-index-manifest.json"
+LOG_FILE_PATTERN = re.compile(r"^(\d{4}-\d{2}-\d{2})_all-events\.jsonl$")
+RELATIVE_TIME_PATTERN = re.compile(r"^(\d+)([smhdw])$")
+RELATIVE_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+def parse_time(value: str) -> int:
+    """
+    Parses a time filter into an epoch timestamp.
+    Accepts epoch seconds, ISO dates/datetimes, or relative ages such as "30m", "24h", "7d".
+    """
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    match = RELATIVE_TIME_PATTERN.match(value)
+    if match:
+        return int(time.time()) - int(match.group(1)) * RELATIVE_UNITS[match.group(2)]
+    return int(datetime.fromisoformat(value).timestamp())
+
+def _empty_index() -> dict:
+    return {
+        "version": INDEX_VERSION,
+        "inode": None,
+        "size": 0,
+        "min_ts": None,
+        "max_ts": None,
+        "offsets": [],
+        "timestamps": [],
+        "sessions": {},
+        "types": {},
+    }
+
+def _load_json(path: str):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_json_atomic(path: str, data: dict):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+def _add_entry(index: dict, offset: int, ts: int, session_id: str, event_type: str):
+    line_number = len(index["offsets"])
+    index["offsets"].append(offset)
+    index["timestamps"].append(ts)
+    index["sessions"].setdefault(session_id, []).append(line_number)
+    index["types"].setdefault(event_type, []).append(line_number)
+    index["min_ts"] = ts if index["min_ts"] is None else min(index["min_ts"], ts)
+    index["max_ts"] = ts if index["max_ts"] is None else max(index["max_ts"], ts)
+
+def _load_index(index_path: str, inode: int):
+    """
+    Replays a sidecar index. Returns None when it is missing, from another version or log file,
+    or damaged, so the caller rebuilds it.
+    """
+    try:
+        with open(index_path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    lines = data.split(b'\n')
+    if lines.pop() != b'' or not lines:
+        # Empty, or a torn final line from an interrupted append
+        return None
+
+    try:
+        header = json.loads(lines[0])
+        if header.get("version") != INDEX_VERSION or header.get("inode") != inode:
+            return None
+        index = _empty_index()
+        index["inode"] = inode
+        for line in lines[1:]:
+            update = json.loads(line)
+            if update["from"] > index["size"]:
+                return None
+            # Two queries may index the same bytes concurrently; keep only what is new
+            for offset, ts, session_id, event_type in update["entries"]:
+                if offset >= index["size"]:
+                    _add_entry(index, offset, ts, session_id, event_type)
+            index["size"] = max(index["size"], update["to"])
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return None
+    return index
+
+def _append_update(index_path: str, header: dict, update: dict):
+    line = json.dumps(update, separators=(',', ':')).encode('utf-8') + b'\n'
+    if header is not None:
+        # New index: write it whole and swap it in
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(json.dumps(header, separators=(',', ':')).encode('utf-8') + b'\n' + line)
+        os.replace(tmp_path, index_path)
+        return
+    fd = os.open(index_path, os.O_WRONLY | os.O_APPEND)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+def update_file_index(log_path: str, stat_result: os.stat_result = None) -> dict:
+    """
+    Brings the sidecar index of one log file up to date and returns it.
+    Only the bytes appended since the last update are parsed, and only their entries are written.
+    """
+    stat_result = stat_result or os.stat(log_path)
+    index_path = log_path + INDEX_SUFFIX
+    index = _load_index(index_path, stat_result.st_ino)
+    header = None
+
+    if index is None or index["size"] > stat_result.st_size:
+        # Missing, outdated or the log was replaced/truncated: start over
+        index = _empty_index()
+        index["inode"] = stat_result.st_ino
+        header = {"version": INDEX_VERSION, "inode": stat_result.st_ino}
+
+    if index["size"] == stat_result.st_size and header is None:
+        return index
+
+    with open(log_path, 'rb') as f:
+        f.seek(index["size"])
+        data = f.read(stat_result.st_size - index["size"])
+
+    # Only index complete lines; a partially written trailing line is picked up next time
+    end = data.rfind(b'\n') + 1
+    if end == 0 and header is None:
+        return index
+    offset = index["size"]
+    entries = []
+    for raw_line in data[:end].splitlines(keepends=True):
+        line_offset = offset
+        offset += len(raw_line)
+        if not raw_line.strip():
+            continue
+        try:
+            event = json.loads(raw_line)
+        except ValueError:
+            continue
+
+        ts = event.get("timestamp")
+        ts = int(ts) if isinstance(ts, (int, float)) else 0
+        entry = [line_offset, ts, str(event.get("session_id")), str(event.get("hook_event_type"))]
+        entries.append(entry)
+        _add_entry(index, *entry)
+    update = {"from": index["size"], "to": index["size"] + end, "entries": entries}
+    index["size"] += end
+
+    try:
+        _append_update(index_path, header, update)
+    except OSError as e:
+        print(f"Warning: Could not write index for {log_path}: {e}", file=sys.stderr)
+    return index
+
+def _list_log_files(log_root: str, since: int = None, until: int = None):
+    """
+    Lists daily log files, skipping month directories and days that cannot overlap the time range.
+    """
+    # Allow a day of slack for local time zones around the date boundaries
+    since_day = datetime.fromtimestamp(since - 86400).strftime('%Y-%m-%d') if since is not None else None
+    until_day = datetime.fromtimestamp(until + 86400).strftime('%Y-%m-%d') if until is not None else None
+
+    try:
+        month_dirs = sorted(os.listdir(log_root))
+    except FileNotFoundError:
+        return []
+
+    log_files = []
+    for month in month_dirs:
+        if since_day and month < since_day[:7]:
+            continue
+        if until_day and month > until_day[:7]:
+            continue
+        month_dir = os.path.join(log_root, month)
+        if not os.path.isdir(month_dir):
+            continue
+        for filename in sorted(os.listdir(month_dir)):
+            match = LOG_FILE_PATTERN.match(filename)
+            if not match:
+                continue
+            day = match.group(1)
+            if (since_day and day < since_day) or (until_day and day > until_day):
+                continue
+            log_files.append(os.path.join(month_dir, filename))
+    return log_files
+
+def _candidate_lines(index: dict, session_id: str = None, event_type: str = None,
+                     since: int = None, until: int = None) -> list:
+    postings = []
+    if session_id is not None:
+        postings.append(index["sessions"].get(session_id, []))
+    if event_type is not None:
+        postings.append(index["types"].get(event_type, []))
+
+    if postings:
+        postings.sort(key=len)
+        lines = postings[0]
+        for other in postings[1:]:
+            other_set = set(other)
+            lines = [n for n in lines if n in other_set]
+    else:
+        lines = range(len(index["offsets"]))
+
+    if since is None and until is None:
+        return list(lines)
+    timestamps = index["timestamps"]
+    return [
+        n for n in lines
+        if (since is None or timestamps[n] >= since) and (until is None or timestamps[n] <= until)
+    ]
+
+def query_events(session_id: str = None, event_type: str = None, since: int = None, until: int = None,
+                 limit: int = None, log_root: str = None):
+    """
+    Yields raw JSONL lines (bytes) for events matching every given filter, oldest file first.
+    """
+    if log_root is None:
+        from .emitter import get_log_root
+        log_root = get_log_root()
+
+    manifest_path = os.path.join(log_root, MANIFEST_NAME)
+    manifest = _load_json(manifest_path) or {}
+    manifest_changed = False
+    matched = 0
+
+    try:
+        for log_path in _list_log_files(log_root, since, until):
+            if limit is not None and matched >= limit:
+                return
+            stat_result = os.stat(log_path)
+            key = os.path.relpath(log_path, log_root)
+            entry = manifest.get(key)
+
+            # Prune whole files by their timestamp range and session/type keys when the manifest
+            # is current for them, so the sidecar index of a file without matches is never read
+            if entry and entry.get("size") == stat_result.st_size and entry.get("inode") == stat_result.st_ino:
+                if entry.get("min_ts") is None:
+                    continue
+                if since is not None and entry["max_ts"] < since:
+                    continue
+                if until is not None and entry["min_ts"] > until:
+                    continue
+                if session_id is not None and session_id not in entry.get("sessions", []):
+                    continue
+                if event_type is not None and event_type not in entry.get("types", []):
+                    continue
+
+            index = update_file_index(log_path, stat_result)
+            new_entry = {
+                "inode": index["inode"],
+                "size": index["size"],
+                "min_ts": index["min_ts"],
+                "max_ts": index["max_ts"],
+                "sessions": sorted(index["sessions"]),
+                "types": sorted(index["types"]),
+            }
+            if entry != new_entry:
+                manifest[key] = new_entry
+                manifest_changed = True
+
+            lines = _candidate_lines(index, session_id, event_type, since, until)
+            if not lines:
+                continue
+
+            with open(log_path, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    for line_number in lines:
+                        if limit is not None and matched >= limit:
+                            return
+                        start = index["offsets"][line_number]
+                        end = mapped.find(b'\n', start)
+                        yield mapped[start:end if end != -1 else len(mapped)]
+                        matched += 1
+    finally:
+        if manifest_changed:
+            _save_manifest(manifest_path, manifest)
+
+def _save_manifest(manifest_path: str, manifest: dict):
+    # Merge with whatever a concurrent query stored in the meantime
+    try:
+        with open(manifest_path + ".lock", 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            current = _load_json(manifest_path) or {}
+            current.update(manifest)
+            _write_json_atomic(manifest_path, current)
+    except OSError as e:
+        print(f"Warning: Could not update event index manifest: {e}", file=sys.stderr)
+
+def rebuild_indexes(log_root: str = None) -> int:
+    """
+    Drops every sidecar index and the manifest so the next query rebuilds them.
+    Returns the number of index files removed.
+    """
+    if log_root is None:
+        from .emitter import get_log_root
+        log_root = get_log_root()
+
+    removed = 0
+    for log_path in _list_log_files(log_root):
+        index_path = log_path + INDEX_SUFFIX
+        if os.path.exists(index_path):
+            os.remove(index_path)
+            removed += 1
+    manifest_path = os.path.join(log_root, MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    return removed
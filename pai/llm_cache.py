@@ -0,0 +1,216 @@
+import os
+import sys
+import json
+import time
+import fcntl
+import shutil
+import hashlib
+import argparse
+
+# How often (at most) a process walks the cache to enforce the size and age limits
+EVICTION_INTERVAL_SECONDS = 60
+
+# Per-process counters; the cumulative ones live in stats.json inside the cache directory
+session_stats = {"hits": 0, "misses": 0}
+
+def cache_enabled() -> bool:
+    """
+    The response cache is opt-in via PAI_LLM_CACHE=1.
+    """
+    return os.environ.get('PAI_LLM_CACHE', '').lower() in ('1', 'true', 'yes', 'on')
+
+def get_cache_dir() -> str:
+    cache_dir = os.environ.get('PAI_LLM_CACHE_DIR')
+    if cache_dir:
+        return cache_dir
+    pai_dir = os.environ.get('PAI_DIR', os.path.join(os.path.expanduser('~'), '.claude'))
+    return os.path.join(pai_dir, 'cache', 'llm')
+
+def get_max_bytes() -> int:
+    return int(float(os.environ.get('PAI_LLM_CACHE_MAX_MB', '256')) * 1024 * 1024)
+
+def get_max_age_seconds() -> float:
+    return float(os.environ.get('PAI_LLM_CACHE_MAX_AGE_DAYS', '30')) * 86400
+
+def make_key(model: str, messages: list, params: dict) -> str:
+    """
+    Hashes everything that determines the response into a content address.
+    """
+    canonical = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        sort_keys=True,
+        separators=(',', ':'),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def _entry_path(key: str) -> str:
+    return os.path.join(get_cache_dir(), key[:2], f"{key}.json")
+
+def get(key: str):
+    """
+    Returns the cached entry for `key`, or None on a miss.
+    A hit refreshes the entry's mtime, which is what LRU eviction orders by.
+    """
+    path = _entry_path(key)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        _record("misses")
+        return None
+
+    if time.time() - entry.get("created", 0) > get_max_age_seconds():
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        _record("misses")
+        return None
+
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    _record("hits", saved_chars=len(entry.get("content", "")))
+    return entry
+
+def put(key: str, model: str, content: str, chunks: list = None):
+    """
+    Stores a response. The write is atomic, so concurrent readers never see a partial entry.
+    """
+    path = _entry_path(key)
+    entry = {
+        "model": model,
+        "content": content,
+        "chunks": chunks if chunks is not None else [content],
+        "created": time.time(),
+    }
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: Could not write LLM cache entry: {e}", file=sys.stderr)
+        return
+    _maybe_evict()
+
+def replay(entry: dict):
+    """
+    Yields a cached response chunk by chunk, like a live stream.
+    """
+    for chunk in entry.get("chunks") or [entry.get("content", "")]:
+        yield chunk
+
+def _record(counter: str, saved_chars: int = 0):
+    session_stats[counter] += 1
+    cache_dir = get_cache_dir()
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(os.path.join(cache_dir, 'stats.json.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            stats = read_stats()
+            stats[counter] = stats.get(counter, 0) + 1
+            stats["saved_chars"] = stats.get("saved_chars", 0) + saved_chars
+            tmp_path = os.path.join(cache_dir, f"stats.json.{os.getpid()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(stats, f)
+            os.replace(tmp_path, os.path.join(cache_dir, 'stats.json'))
+    except OSError:
+        pass
+
+def read_stats() -> dict:
+    """
+    Returns the cumulative hit/miss counters shared by all processes.
+    """
+    try:
+        with open(os.path.join(get_cache_dir(), 'stats.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"hits": 0, "misses": 0, "saved_chars": 0}
+
+def _maybe_evict():
+    marker = os.path.join(get_cache_dir(), '.last-eviction')
+    try:
+        if time.time() - os.path.getmtime(marker) < EVICTION_INTERVAL_SECONDS:
+            return
+    except OSError:
+        pass
+    evict()
+
+def evict() -> int:
+    """
+    Removes expired entries, then least-recently-used ones until the cache fits its size limit.
+    Only one process evicts at a time; others skip. Returns the number of entries removed.
+    """
+    cache_dir = get_cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(os.path.join(cache_dir, '.eviction.lock'), 'w') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return 0
+
+        with open(os.path.join(cache_dir, '.last-eviction'), 'w'):
+            pass
+
+        now = time.time()
+        max_age = get_max_age_seconds()
+        entries = []
+        removed = 0
+        for root, _, files in os.walk(cache_dir):
+            for filename in files:
+                if not filename.endswith('.json') or root == cache_dir:
+                    continue
+                path = os.path.join(root, filename)
+                try:
+                    stat_result = os.stat(path)
+                except OSError:
+                    continue
+                if now - stat_result.st_mtime > max_age:
+                    try:
+                        os.remove(path)
+                        removed += 1
+                    except OSError:
+                        pass
+                    continue
+                entries.append((stat_result.st_mtime, stat_result.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        max_bytes = get_max_bytes()
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+                total -= size
+            except OSError:
+                pass
+        return removed
+
+def clear():
+    """
+    Deletes every cached response and the statistics.
+    """
+    shutil.rmtree(get_cache_dir(), ignore_errors=True)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Inspect or manage the LLM response cache.")
+    parser.add_argument("action", choices=["stats", "evict", "clear"], help="What to do with the cache.")
+    args = parser.parse_args()
+
+    if args.action == "stats":
+        stats = read_stats()
+        lookups = stats.get("hits", 0) + stats.get("misses", 0)
+        hit_rate = stats.get("hits", 0) / lookups * 100 if lookups else 0.0
+        print(f"Cache directory: {get_cache_dir()}")
+        print(f"Hits: {stats.get('hits', 0)}  Misses: {stats.get('misses', 0)}  Hit rate: {hit_rate:.1f}%")
+        print(f"Response characters served from cache: {stats.get('saved_chars', 0)}")
+    elif args.action == "evict":
+        print(f"Evicted {evict()} entries.")
+    elif args.action == "clear":
+        clear()
+        print("Cache cleared.")
@@ -0,0 +1,199 @@
+import os
+import json
+import time
+import fcntl
+import threading
+
+# Rolling window of observations kept per model, and how many are needed before they are trusted
+WINDOW = 50
+MIN_SAMPLES = 5
+# Models failing more often than this are tried after the healthy ones
+ERROR_DEMOTE_THRESHOLD = 0.5
+# Lower bound on the hedge budget (ms)
+MIN_HEDGE_BUDGET_MS = 250.0
+
+def hedging_enabled() -> bool:
+    """
+    Hedged requests are on by default; PAI_HEDGE=0 leaves only fallback-on-error.
+    """
+    return os.environ.get('PAI_HEDGE', '1').lower() not in ('0', 'false', 'no', 'off')
+
+def default_hedge_budget_ms() -> float:
+    """
+    Budget used before a model has enough history (PAI_HEDGE_BUDGET_MS, default 4000).
+    """
+    return float(os.environ.get('PAI_HEDGE_BUDGET_MS', '4000'))
+
+def _pai_dir() -> str:
+    return os.environ.get('PAI_DIR', os.path.join(os.path.expanduser('~'), '.claude'))
+
+def get_stats_path() -> str:
+    return os.path.join(_pai_dir(), 'cache', 'model-stats.json')
+
+def _parse_model_list(value: str) -> list:
+    return [model.strip() for model in value.split(',') if model.strip()]
+
+def models_for(skill: str = None, default_model: str = None) -> list:
+    """
+    Ordered model list for a skill: PAI_MODELS_<SKILL>, then the skill's entry in
+    $PAI_DIR/pai-models.json, then PAI_MODELS / the file's "default", then `default_model`.
+    """
+    if skill:
+        env_value = os.environ.get(f"PAI_MODELS_{skill.upper()}")
+        if env_value:
+            return _parse_model_list(env_value)
+
+    config = {}
+    try:
+        with open(os.path.join(_pai_dir(), 'pai-models.json'), 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    if skill and config.get(skill):
+        return list(config[skill])
+    if os.environ.get('PAI_MODELS'):
+        return _parse_model_list(os.environ['PAI_MODELS'])
+    if config.get("default"):
+        return list(config["default"])
+    return [default_model] if default_model else []
+
+def load_stats() -> dict:
+    try:
+        with open(get_stats_path(), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _latency_field(stream: bool) -> str:
+    return "ttft_ms" if stream else "duration_ms"
+
+def _censored_field(stream: bool) -> str:
+    return f"censored_{_latency_field(stream)}"
+
+def _observation(status: str, ttft_ms: float, duration_ms: float, stream: bool):
+    """
+    Returns (latency field, latency) for one call, or (None, None) when it carries no latency.
+    A cancelled call (e.g. a hedge that lost) is a censored sample: it is not an outcome, and the
+    time it had already waited is only a lower bound on its latency, so it is kept apart from the
+    observed latencies (see latency_estimate).
+    """
+    if status == "ok":
+        return _latency_field(stream), ttft_ms if stream else duration_ms
+    if status == "cancelled":
+        return _censored_field(stream), ttft_ms if stream and ttft_ms is not None else duration_ms
+    return None, None
+
+def record_calls(calls: list):
+    """
+    Adds observations, given as (model, status, ttft_ms, duration_ms, stream), to the models'
+    rolling windows, shared by all processes, in one locked read-modify-write.
+    """
+    path = get_stats_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            stats = load_stats()
+            for model, status, ttft_ms, duration_ms, stream in calls:
+                entry = stats.setdefault(model, {"outcomes": [], "ttft_ms": [], "duration_ms": []})
+                if status in ("ok", "error"):
+                    entry["outcomes"] = (entry.get("outcomes", []) + [1 if status == "ok" else 0])[-WINDOW:]
+                field, latency = _observation(status, ttft_ms, duration_ms, stream)
+                if latency is not None:
+                    entry[field] = (entry.get(field, []) + [round(latency, 1)])[-WINDOW:]
+                entry["updated"] = int(time.time())
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(stats, f)
+            os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+# Observations waiting for the background recorder, and the thread writing them if one is running
+_queued_calls = []
+_queue_lock = threading.Lock()
+_recorder = None
+
+def queue_call(model: str, status: str, ttft_ms: float = None, duration_ms: float = None, stream: bool = False):
+    """
+    Records an observation from a background thread, so the caller (the LLM pool's event loop)
+    never waits on the stats file lock. Observations that pile up meanwhile are written together.
+    """
+    global _recorder
+    with _queue_lock:
+        _queued_calls.append((model, status, ttft_ms, duration_ms, stream))
+        if _recorder is None:
+            # Not a daemon thread: the interpreter waits for the last batch before exiting
+            _recorder = threading.Thread(target=_drain_queue, name="pai-model-stats")
+            _recorder.start()
+
+def flush_calls(timeout: float = 5.0):
+    """
+    Waits until the queued observations have been written.
+    """
+    recorder = _recorder
+    if recorder is not None:
+        recorder.join(timeout)
+
+def _drain_queue():
+    global _recorder
+    while True:
+        with _queue_lock:
+            calls = _queued_calls[:]
+            del _queued_calls[:]
+            if not calls:
+                _recorder = None
+                return
+        record_calls(calls)
+
+def error_rate(entry: dict) -> float:
+    outcomes = entry.get("outcomes", [])
+    if len(outcomes) < MIN_SAMPLES:
+        return 0.0
+    return 1.0 - sum(outcomes) / len(outcomes)
+
+def p95(values: list):
+    if len(values) < MIN_SAMPLES:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+def latency_estimate(entry: dict, stream: bool):
+    """
+    Returns (rank, ms) for ordering a model. Censored waits only ever raise the estimate above the
+    observed p95, since the model was still silent when they ended. Rank 0: too little history
+    yet; rank 1: an observed p95; rank 2: censored waits but no observed p95, i.e. a model known
+    only to lose hedges, which is tried after every measured one.
+    """
+    observed = p95(entry.get(_latency_field(stream), []))
+    censored = entry.get(_censored_field(stream), [])
+    lower_bound = max(censored) if censored else None
+    if observed is not None:
+        return 1, max(observed, lower_bound or 0.0)
+    if lower_bound is not None:
+        return 2, lower_bound
+    return 0, 0.0
+
+def order_models(models: list, stream: bool, stats: dict = None) -> list:
+    """
+    Orders models by estimated latency (see latency_estimate), with models failing often moved to
+    the back. Models without any history yet go first, in configured order, so they get measured.
+    """
+    stats = load_stats() if stats is None else stats
+
+    def key(model):
+        entry = stats.get(model, {})
+        return (error_rate(entry) > ERROR_DEMOTE_THRESHOLD,) + latency_estimate(entry, stream)
+    return sorted(models, key=key)
+
+def hedge_budget_ms(model: str, stream: bool, stats: dict = None) -> float:
+    """
+    How long to wait on `model` before hedging: its observed p95 time to first token
+    for streams, or p95 duration for whole responses.
+    """
+    stats = load_stats() if stats is None else stats
+    observed = p95(stats.get(model, {}).get(_latency_field(stream), []))
+    if observed is None:
+        return default_hedge_budget_ms()
+    return max(MIN_HEDGE_BUDGET_MS, observed)
@@ -0,0 +1,135 @@
+import os
+import time
+import uuid
+import contextvars
+from .emitter import create_event, emit_event
+from . import llm_router
+
+# The record of the LLM call running in the current task, if any
+_current_call = contextvars.ContextVar("pai_llm_call", default=None)
+
+# Session of LLMCall events in a process run without PAI_SESSION_ID (e.g. a skill run directly)
+_process_session_id = None
+
+def get_session_id() -> str:
+    """
+    The session LLMCall events belong to: PAI_SESSION_ID, or else one id for the whole process.
+    """
+    global _process_session_id
+    session_id = os.environ.get('PAI_SESSION_ID')
+    if session_id:
+        return session_id
+    if _process_session_id is None:
+        _process_session_id = str(uuid.uuid4())
+    return _process_session_id
+
+def timing_enabled() -> bool:
+    """
+    LLMCall events are on by default; PAI_LLM_TIMING=0 turns them off.
+    """
+    return os.environ.get('PAI_LLM_TIMING', '1').lower() not in ('0', 'false', 'no', 'off')
+
+def start_call(model: str, stream: bool, cached: bool = False, skill: str = None, routed: bool = False) -> dict:
+    """
+    Starts the timing record of one LLM call made on behalf of `skill` (default: PAI_SKILL).
+    `routed` marks a call picked among several models, whose outcome feeds llm_router's stats.
+    """
+    return {
+        "model": model,
+        "skill": skill or os.environ.get('PAI_SKILL'),
+        "stream": stream,
+        "cached": cached,
+        "hedged": False,
+        "status": "ok",
+        "retries": 0,
+        "queue_ms": 0.0,
+        "connect_ms": 0.0,
+        "headers_ms": None,
+        "ttft_ms": None,
+        "duration_ms": None,
+        "prompt_tokens": None,
+        "completion_tokens": None,
+        "chunks": 0,
+        "response_chars": 0,
+        "tokens_per_second": None,
+        "_start": time.perf_counter(),
+        "_routed": routed,
+    }
+
+def activate(record: dict):
+    """
+    Makes `record` the target of HTTP trace and retry notifications in the current task.
+    """
+    _current_call.set(record)
+
+def elapsed_ms(record: dict) -> float:
+    return (time.perf_counter() - record["_start"]) * 1000
+
+def note_retry():
+    record = _current_call.get()
+    if record is not None:
+        record["retries"] += 1
+
+def note_chunk(record: dict, content: str):
+    if record["ttft_ms"] is None:
+        record["ttft_ms"] = elapsed_ms(record)
+    record["chunks"] += 1
+    record["response_chars"] += len(content)
+
+def note_usage(record: dict, usage):
+    if usage is not None:
+        record["prompt_tokens"] = getattr(usage, "prompt_tokens", None)
+        record["completion_tokens"] = getattr(usage, "completion_tokens", None)
+
+async def trace_http(name: str, info: dict):
+    """
+    httpcore trace callback: splits connection setup and time-to-headers out of the call.
+    """
+    record = _current_call.get()
+    if record is None:
+        return
+    now = time.perf_counter()
+    if name in ("connection.connect_tcp.started", "connection.start_tls.started"):
+        record["_connect_started"] = now
+    elif name in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+        record["connect_ms"] += (now - record.pop("_connect_started", now)) * 1000
+    elif name.endswith("receive_response_headers.complete"):
+        record["headers_ms"] = (now - record["_start"]) * 1000
+
+async def attach_trace(request):
+    """
+    httpx request hook that installs trace_http on every request.
+    """
+    request.extensions["trace"] = trace_http
+
+def finish_call(record: dict, status: str = None):
+    """
+    Completes the record and emits it as an LLMCall event.
+    """
+    if status:
+        record["status"] = status
+    record["duration_ms"] = elapsed_ms(record)
+    if record["ttft_ms"] is None and not record["stream"] and record["status"] == "ok":
+        record["ttft_ms"] = record["duration_ms"]
+
+    # Generation speed excludes the wait for the first token
+    tokens = record["completion_tokens"] or record["chunks"]
+    generation_ms = record["duration_ms"] - (record["ttft_ms"] or 0) if record["stream"] else record["duration_ms"]
+    if tokens and generation_ms > 0:
+        record["tokens_per_second"] = round(tokens / (generation_ms / 1000), 2)
+
+    if record["_routed"] and not record["cached"]:
+        # Feeds the per-model latency/error window used for routing and hedge budgets
+        llm_router.queue_call(record["model"], record["status"], record["ttft_ms"],
+                              record["duration_ms"], record["stream"])
+
+    if not timing_enabled():
+        return
+    payload = {key: (round(value, 2) if isinstance(value, float) else value)
+               for key, value in record.items() if not key.startswith("_")}
+    emit_event(create_event(
+        source_app="pai-llm",
+        hook_event_type="LLMCall",
+        payload=payload,
+        session_id=get_session_id(),
+    ))
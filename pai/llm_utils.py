@@ -1,51 +1,473 @@
 import os
-from openai import OpenAI
-
-# Initialize the OpenAI client
-api_key = os.getenv("OPENROUTER_API_KEY")
-if not api_key:
-    # We won't exit here, as this module might be imported in environments
-    # where the API key is not required. The calling code should handle this.
-    print("Warning: OPENROUTER_API_KEY environment variable not set.", file=sys.stderr)
-    client = None
-else:
-    client = OpenAI(
-        base_url="https://openrouter.ai/api/v1",
-        api_key=api_key,
+import sys
+import time
+import atexit
+import random
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+from . import llm_cache
+from . import llm_timing
+from . import llm_router
+
+DEFAULT_MODEL = "minimax/minimax-m2:free"
+DEFAULT_TEMPERATURE = 0.1
+BASE_URL = "https://openrouter.ai/api/v1"
+
+MAX_RETRY_DELAY = 60.0
+
+NO_CLIENT_MESSAGE = "OpenAI client is not initialized. Please set the OPENROUTER_API_KEY environment variable."
+
+
+def get_api_key() -> str:
+    return os.getenv("OPENROUTER_API_KEY")
+
+# Read on use rather than at import, so daemon workers honour the values each request forwards
+
+def max_in_flight() -> int:
+    """
+    Upper bound on requests in flight per process (PAI_LLM_MAX_CONCURRENCY).
+    """
+    return int(os.environ.get('PAI_LLM_MAX_CONCURRENCY', '8'))
+
+def max_retries() -> int:
+    """
+    Retries of 429/5xx/connection errors per request (PAI_LLM_MAX_RETRIES).
+    """
+    return int(os.environ.get('PAI_LLM_MAX_RETRIES', '4'))
+
+def request_timeout() -> float:
+    return float(os.environ.get('PAI_LLM_TIMEOUT', '120'))
+
+def is_error_response(content: str) -> bool:
+    """
+    Tells apart the error strings call_llm/acall_llm return from real answers.
+    """
+    return content is None or content == NO_CLIENT_MESSAGE or content.startswith("An error occurred: ")
+
+
+class _ConnectionPool:
+    """
+    Owns the process's AsyncOpenAI client, its keep-alive connections and the
+    in-flight semaphore, all bound to one event loop running on a background thread.
+    Both acall_llm (from any loop) and the sync call_llm submit their work here.
+    Created on the first LLM call, so importing this module never loads the openai SDK.
+    """
+    def __init__(self):
+        self.pid = os.getpid()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="pai-llm-pool", daemon=True)
+        self.thread.start()
+        self.client = None
+        self.semaphore = None
+        self.run_sync(self._setup())
+
+    async def _setup(self):
+        self.semaphore = asyncio.Semaphore(max_in_flight())
+        api_key = get_api_key()
+        if not api_key:
+            # Not fatal: callers get NO_CLIENT_MESSAGE back and handle it
+            print("Warning: OPENROUTER_API_KEY environment variable not set.", file=sys.stderr)
+            return
+
+        import openai
+        self.client = openai.AsyncOpenAI(
+            # PAI_LLM_BASE_URL points the client at any OpenAI-compatible server, e.g. pai.bench.fake_server
+            base_url=os.environ.get('PAI_LLM_BASE_URL', BASE_URL),
+            api_key=api_key,
+            max_retries=0,  # retries are handled by _with_retries
+            timeout=request_timeout(),
+            http_client=_take_http_client(),
+        )
+
+    def run_sync(self, coro):
+        """
+        Runs a coroutine on the pool's loop and blocks until it finishes.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def run(self, coro):
+        """
+        Awaits a coroutine on the pool's loop from whatever loop the caller is on.
+        """
+        if asyncio.get_running_loop() is self.loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+
+    def close(self):
+        if self.client is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(self.client.close(), self.loop).result(timeout=2)
+            except Exception:
+                pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+def _make_http_client():
+    import openai
+    if not hasattr(openai, 'DefaultAsyncHttpxClient'):
+        return None
+    # Trace hooks split connection setup and time-to-headers out of each call
+    return openai.DefaultAsyncHttpxClient(
+        timeout=request_timeout(),
+        event_hooks={"request": [llm_timing.attach_trace]},
     )
 
-def call_llm(messages: list, stream: bool = False):
+# An unused HTTP client built by preload() before forking; the first pool of each worker takes it
+_prepared_http_client = None
+
+def _take_http_client():
+    global _prepared_http_client
+    http_client, _prepared_http_client = _prepared_http_client, None
+    return http_client if http_client is not None else _make_http_client()
+
+def preload():
     """
-    Sends a list of messages to the LLM.
-    If stream is True, yields response chunks.
-    Otherwise, returns the complete response content.
+    Does the fork-safe part of client setup ahead of time, for the daemon: imports the SDK and its
+    lazily loaded chat resources and builds an HTTP client that has not connected yet (its TLS
+    context is the costly part). The event loop and open connections cannot survive fork, so each
+    worker still starts its own loop thread and opens its own connection.
     """
-    if not client:
-        error_message = "OpenAI client is not initialized. Please set the OPENROUTER_API_KEY environment variable."
-        if stream:
-            yield error_message
-        else:
-            return error_message
+    global _prepared_http_client
+    import openai
+    _prepared_http_client = _make_http_client()
+    # Touching the resource attributes imports their modules; the throwaway client is never used
+    openai.AsyncOpenAI(api_key="preload", base_url=BASE_URL, http_client=_prepared_http_client).chat.completions
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool() -> _ConnectionPool:
+    global _pool
+    with _pool_lock:
+        # A forked child (e.g. a daemon worker) cannot reuse its parent's loop thread
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = _ConnectionPool()
+        return _pool
+
+def _close_pool():
+    if _pool is not None and _pool.pid == os.getpid():
+        _pool.close()
+
+atexit.register(_close_pool)
 
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """
+    Honours retry-after(-ms) when the server sends it, otherwise backs off exponentially with jitter.
+    """
+    response = getattr(error, 'response', None)
+    headers = response.headers if response is not None else {}
+    retry_after_ms = headers.get('retry-after-ms')
+    retry_after = headers.get('retry-after')
     try:
-        completion = client.chat.completions.create(
-            model="minimax/minimax-m2:free",
+        if retry_after_ms:
+            return min(float(retry_after_ms) / 1000.0, MAX_RETRY_DELAY)
+        if retry_after:
+            try:
+                return min(float(retry_after), MAX_RETRY_DELAY)
+            except ValueError:
+                return min(max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time()), MAX_RETRY_DELAY)
+    except (TypeError, ValueError):
+        pass
+    return min(0.5 * (2 ** attempt), MAX_RETRY_DELAY / 2) * (0.5 + random.random())
+
+async def _with_retries(create_request):
+    """
+    Calls `create_request()` and retries on 429, 5xx and connection errors.
+    """
+    from openai import APIStatusError, APIConnectionError
+    retries = max_retries()
+    for attempt in range(retries + 1):
+        try:
+            return await create_request()
+        except APIStatusError as e:
+            if (e.status_code != 429 and e.status_code < 500) or attempt == retries:
+                raise
+            delay = _retry_delay(e, attempt)
+        except APIConnectionError as e:
+            if attempt == retries:
+                raise
+            delay = _retry_delay(e, attempt)
+        llm_timing.note_retry()
+        await asyncio.sleep(delay)
+
+async def _acomplete(pool: _ConnectionPool, messages: list, model: str, temperature: float, record: dict) -> str:
+    llm_timing.activate(record)
+    async with pool.semaphore:
+        record["queue_ms"] = llm_timing.elapsed_ms(record)
+        completion = await _with_retries(lambda: pool.client.chat.completions.create(
+            model=model,
             messages=messages,
-            temperature=0.1,
-            stream=stream,
-        )
-        if stream:
-            def stream_generator():
-                for chunk in completion:
-                    content = chunk.choices[0].delta.content
-                    if content:
-                        yield content
-            return stream_generator()
-        else:
-            return completion.choices[0].message.content
+            temperature=temperature,
+            stream=False,
+            timeout=request_timeout(),
+        ))
+    content = completion.choices[0].message.content
+    llm_timing.note_usage(record, getattr(completion, "usage", None))
+    record["response_chars"] = len(content or "")
+    return content
+
+async def _astream(pool: _ConnectionPool, messages: list, model: str, temperature: float,
+                   cache_key: str = None, hedged: bool = False, skill: str = None, routed: bool = False):
+    """
+    Yields response chunks on the pool's loop and caches the full answer once the stream completes.
+    """
+    if pool.client is None:
+        yield NO_CLIENT_MESSAGE
+        return
+
+    record = llm_timing.start_call(model, stream=True, skill=skill, routed=routed)
+    record["hedged"] = hedged
+    llm_timing.activate(record)
+    status = "cancelled"
+    completion = None
+    chunks = []
+    try:
+        async with pool.semaphore:
+            record["queue_ms"] = llm_timing.elapsed_ms(record)
+            completion = await _with_retries(lambda: pool.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                stream=True,
+                stream_options={"include_usage": True},
+                timeout=request_timeout(),
+            ))
+            async for chunk in completion:
+                # With include_usage the final chunk carries token counts and no choices
+                llm_timing.note_usage(record, getattr(chunk, "usage", None))
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if content:
+                    llm_timing.note_chunk(record, content)
+                    chunks.append(content)
+                    yield content
+        status = "ok"
     except Exception as e:
-        error_message = f"An error occurred: {e}"
-        if stream:
-            yield error_message
-        else:
-            return error_message
+        status = "error"
+        yield f"An error occurred: {e}"
+        return
+    finally:
+        if completion is not None and status != "ok":
+            # Releases the connection of a stream abandoned midway, e.g. a hedge that lost
+            await completion.close()
+        llm_timing.finish_call(record, status)
+
+    if cache_key:
+        llm_cache.put(cache_key, model, "".join(chunks), chunks)
+
+async def _anext(agen):
+    return await agen.__anext__()
+
+async def _race(models: list, attempt, stream: bool):
+    """
+    Hedged race over `models` on the pool's loop. Starts `attempt(index, model)` for the first model
+    and starts the next one whenever the newest attempt outlives its hedge budget or comes back with
+    an error. Returns (index, result) of the first usable result, or of the last error, and cancels
+    whatever is still running.
+    """
+    stats = llm_router.load_stats()
+    tasks = []
+    pending = set()
+
+    def launch():
+        index = len(tasks)
+        task = asyncio.ensure_future(attempt(index, models[index]))
+        tasks.append(task)
+        return task
+
+    pending.add(launch())
+    index, result = 0, None
+    try:
+        while pending:
+            timeout = None
+            if llm_router.hedging_enabled() and len(tasks) < len(models):
+                timeout = llm_router.hedge_budget_ms(models[len(tasks) - 1], stream, stats) / 1000.0
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                pending.add(launch())
+                continue
+            for task in sorted(done, key=tasks.index):
+                index, result = tasks.index(task), task.result()
+                if not is_error_response(result):
+                    return index, result
+            if not pending and len(tasks) < len(models):
+                pending.add(launch())
+        return index, result
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+async def _ahedged_stream(pool: _ConnectionPool, messages: list, models: list, temperature: float,
+                          cache_key: str = None, skill: str = None):
+    """
+    Streams from whichever of `models` produces a usable first chunk first (see _race).
+    """
+    if pool.client is None:
+        yield NO_CLIENT_MESSAGE
+        return
+
+    streams = {}
+
+    async def first_chunk(index: int, model: str) -> str:
+        streams[index] = agen = _astream(pool, messages, model, temperature, cache_key, hedged=index > 0,
+                                         skill=skill, routed=len(models) > 1)
+        try:
+            return await agen.__anext__()
+        except StopAsyncIteration:
+            return ""
+
+    try:
+        index, chunk = await _race(models, first_chunk, stream=True)
+        for other, agen in streams.items():
+            if other != index:
+                await agen.aclose()
+        if chunk:
+            yield chunk
+        if is_error_response(chunk):
+            return
+        async for chunk in streams[index]:
+            yield chunk
+    finally:
+        for agen in streams.values():
+            await agen.aclose()
+
+async def _ahedged_complete(pool: _ConnectionPool, messages: list, models: list, temperature: float,
+                            skill: str = None):
+    """
+    Returns (index, content) from whichever of `models` answers usably first (see _race).
+    """
+    async def complete(index: int, model: str) -> str:
+        record = llm_timing.start_call(model, stream=False, skill=skill, routed=len(models) > 1)
+        record["hedged"] = index > 0
+        try:
+            content = await _acomplete(pool, messages, model, temperature, record)
+        except asyncio.CancelledError:
+            llm_timing.finish_call(record, "cancelled")
+            raise
+        except Exception as e:
+            llm_timing.finish_call(record, "error")
+            return f"An error occurred: {e}"
+        llm_timing.finish_call(record)
+        return content
+
+    return await _race(models, complete, stream=False)
+
+async def _relay_stream(pool: _ConnectionPool, agen):
+    """
+    Re-yields an async generator that lives on the pool's loop into the caller's loop.
+    """
+    try:
+        while True:
+            try:
+                chunk = await pool.run(_anext(agen))
+            except StopAsyncIteration:
+                return
+            yield chunk
+    finally:
+        await pool.run(agen.aclose())
+
+async def _areplay(entry: dict):
+    for chunk in llm_cache.replay(entry):
+        yield chunk
+
+def resolve_models(model: str = None, models: list = None, skill: str = None) -> list:
+    """
+    The configured models for a call: an explicit `model` alone, the `models` list, or the
+    skill's configured list (see llm_router.models_for). The order they are tried in is
+    decided per call by llm_router.order_models; this list, unreordered, is what the cache keys on.
+    """
+    if model:
+        return [model]
+    return list(models or llm_router.models_for(skill, DEFAULT_MODEL))
+
+async def acall_llm(messages: list, stream: bool = False, model: str = None,
+                    temperature: float = DEFAULT_TEMPERATURE, use_cache: bool = None,
+                    models: list = None, skill: str = None):
+    """
+    Sends a list of messages to the LLM without blocking the event loop.
+    If stream is True, returns an async iterator of response chunks.
+    Otherwise, returns the complete response content.
+    With use_cache (default: PAI_LLM_CACHE), identical requests are answered from the on-disk cache.
+    Without an explicit model the skill's model list is used: a model that has not started answering
+    within its hedge budget gets a hedged request to the next one, and errors fall back to the next one.
+    `skill` (default: PAI_SKILL, the command pai.py dispatched) picks the model list and tags LLMCall events.
+    """
+    skill = skill or os.environ.get('PAI_SKILL')
+    models = resolve_models(model, models, skill)
+    cache_key, entry = _lookup_cache(messages, stream, models, temperature, use_cache, skill)
+    if entry is not None:
+        return _areplay(entry) if stream else entry["content"]
+    return await _acall_uncached(messages, stream, models, temperature, cache_key, skill)
+
+def _lookup_cache(messages: list, stream: bool, models: list, temperature: float, use_cache: bool,
+                  skill: str = None):
+    """
+    Returns (cache key, cached entry). The key is None when caching is off, the entry None on a miss.
+    Needs no connection pool, so a hit never loads the SDK or starts the loop thread.
+    """
+    if use_cache is None:
+        use_cache = llm_cache.cache_enabled()
+    if not use_cache:
+        return None, None
+
+    cache_key = llm_cache.make_key(",".join(models), messages, {"temperature": temperature})
+    entry = llm_cache.get(cache_key)
+    if entry is not None:
+        record = llm_timing.start_call(entry.get("model") or models[0], stream, cached=True, skill=skill)
+        record["response_chars"] = len(entry["content"])
+        llm_timing.finish_call(record)
+    return cache_key, entry
+
+async def _acall_uncached(messages: list, stream: bool, models: list, temperature: float,
+                          cache_key: str = None, skill: str = None):
+    models = llm_router.order_models(models, stream) if len(models) > 1 else models
+    pool = _get_pool()
+    if stream:
+        return _relay_stream(pool, _ahedged_stream(pool, messages, models, temperature, cache_key, skill))
+
+    if pool.client is None:
+        return NO_CLIENT_MESSAGE
+
+    index, content = await pool.run(_ahedged_complete(pool, messages, models, temperature, skill))
+    if cache_key and not is_error_response(content):
+        llm_cache.put(cache_key, models[index], content)
+    return content
+
+def call_llm(messages: list, stream: bool = False, model: str = None,
+             temperature: float = DEFAULT_TEMPERATURE, use_cache: bool = None,
+             models: list = None, skill: str = None):
+    """
+    Sends a list of messages to the LLM.
+    If stream is True, returns a generator of response chunks.
+    Otherwise, returns the complete response content.
+    This is a blocking wrapper around acall_llm that shares its connection pool.
+    """
+    skill = skill or os.environ.get('PAI_SKILL')
+    models = resolve_models(model, models, skill)
+    cache_key, entry = _lookup_cache(messages, stream, models, temperature, use_cache, skill)
+    if entry is not None:
+        return llm_cache.replay(entry) if stream else entry["content"]
+
+    pool = _get_pool()
+    result = pool.run_sync(_acall_uncached(messages, stream, models, temperature, cache_key, skill))
+    if not stream:
+        return result
+    return _iterate_sync(pool, result)
+
+def _iterate_sync(pool: _ConnectionPool, agen):
+    """
+    Drives an async iterator living on the pool's loop from synchronous code.
+    """
+    try:
+        while True:
+            try:
+                chunk = pool.run_sync(_anext(agen))
+            except StopAsyncIteration:
+                return
+            yield chunk
+    finally:
+        pool.run_sync(agen.aclose())
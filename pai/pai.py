@@ -1,32 +1,54 @@
 import sys
-import subprocess
 import os
-import argparse
-import uuid
-from emitter import create_event, emit_event
+import time
+from prompts import get_registry
+
+# Largest chunk read from a skill's pipe at once
+RELAY_READ_SIZE = 65536
+
+def build_parser():
+    import argparse
+    parser = argparse.ArgumentParser(description="PAI CLI")
+    parser.add_argument("command", help="The command to execute.")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Arguments for the command.")
+    return parser
 
 def main():
     """
     Main orchestrator for the PAI CLI.
     Identifies the command and delegates to the appropriate skill script.
     """
-    parser = argparse.ArgumentParser(description="PAI CLI")
-    parser.add_argument("command", help="The command to execute.")
-    parser.add_argument("args", nargs=argparse.REMAINDER, help="Arguments for the command.")
-
     # We need to parse known arguments for the CLI itself,
     # and leave the rest for the skill script.
     # For now, we'll just look for a --stream flag.
     stream_arg = '--stream'
     args = sys.argv[1:]
 
+    registry = get_registry()
+
     if not args:
-        parser.print_help()
+        # argparse is only needed to print the usage
+        build_parser().print_help()
+        print(f"\nAvailable commands: {', '.join(registry.list_skills())}")
         sys.exit(1)
 
+    if args[0] == '--list':
+        for skill_name in registry.list_skills():
+            print(skill_name)
+        return
+
     command = args[0]
     command_args = args[1:]
 
+    if not registry.has_skill(command):
+        print(f"Error: Command '{command}' not found.")
+        sys.exit(1)
+
+    # Only a real dispatch pays for session ids, the event writer and the daemon client
+    import uuid
+    from emitter import create_event, emit_event
+    from daemon import run_in_daemon
+
     # Create a unique session ID for this execution
     session_id = str(uuid.uuid4())
 
@@ -38,48 +60,132 @@ def main():
         session_id=session_id
     )
     emit_event(event)
+    # Skills that emit their own events (e.g. batch) report them under the same session
+    os.environ["PAI_SESSION_ID"] = session_id
 
-    # Construct the path to the skills directory
-    skills_dir = os.path.join(os.path.dirname(__file__), 'skills')
-    skill_path = os.path.join(skills_dir, f"{command}.py")
+    # Tag LLMCall events from the skill with its name
+    os.environ["PAI_SKILL"] = command
 
-    if not os.path.exists(skill_path):
-        print(f"Error: Command '{command}' not found.")
-        sys.exit(1)
+    # Prefer the warm daemon when one is running; it keeps skills imported between calls
+    timings = {"start": time.perf_counter()}
+    exit_code = run_in_daemon(command, command_args, timings)
+    mode = "daemon"
+    if exit_code is None:
+        mode = "subprocess"
+        exit_code = run_subprocess(command, command_args, timings)
+
+    emit_skill_timing(command, mode, exit_code, timings, session_id)
+
+    if exit_code != 0:
+        print(f"Error executing command '{command}'.", file=sys.stderr)
+        sys.exit(exit_code)
 
+def run_subprocess(command: str, command_args: list, timings: dict) -> int:
+    """
+    Runs a skill in a fresh interpreter and relays its output. Returns the exit code,
+    as 128+N if the skill was killed by signal N.
+    """
+    import signal
+    import subprocess
+    from daemon import forward_signals, exit_code_from_status
     # Execute the skill script as a module to allow relative imports
     try:
         # We need to pass the OPENROUTER_API_KEY to the subprocess environment
         env = os.environ.copy()
+        # Streamed tokens must leave the skill as soon as they are printed
+        env["PYTHONUNBUFFERED"] = "1"
 
-        # Use Popen for streaming
         process = subprocess.Popen(
             [sys.executable, '-m', f'pai.skills.{command}'] + command_args,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True,
+            bufsize=0,
             env=env
         )
+        timings["spawned"] = time.perf_counter()
+    except FileNotFoundError:
+        print(f"Error: '{sys.executable}' interpreter not found. Please make sure Python 3 is installed and in your PATH.")
+        sys.exit(1)
 
-        # Stream stdout
-        if process.stdout:
-            for line in iter(process.stdout.readline, ''):
-                print(line, end='', flush=True)
-
-        # Wait for the process to finish and capture stderr
-        stdout, stderr = process.communicate()
-
-        if stderr:
-            print(stderr, file=sys.stderr)
+    # Ctrl-C in a terminal already reaches the skill, which shares our process group
+    skip = (signal.SIGINT,) if terminal_signals_reach_child() else ()
+    with forward_signals(process.send_signal, skip=skip):
+        relay_output(process, timings)
+        returncode = process.wait()
+    return exit_code_from_status(returncode)
 
-        if process.returncode != 0:
-            print(f"Error executing command '{command}'.", file=sys.stderr)
-            sys.exit(1)
+def terminal_signals_reach_child() -> bool:
+    """
+    Whether we are in the foreground of our controlling terminal, which then delivers Ctrl-C to
+    the skill itself. Asks /dev/tty, since stdin, stdout and stderr may all be redirected.
+    """
+    try:
+        fd = os.open('/dev/tty', os.O_RDONLY | os.O_NOCTTY)
+    except OSError:
+        # No controlling terminal (cron, CI, detached): nothing reaches the skill on its own
+        return False
+    try:
+        return os.tcgetpgrp(fd) == os.getpgrp()
+    except OSError:
+        return False
+    finally:
+        os.close(fd)
 
+def relay_output(process, timings: dict):
+    """
+    Forwards the skill's stdout and stderr as raw chunks the moment they arrive. Both pipes
+    are read together, so a skill writing a lot to stderr cannot fill that pipe and stall.
+    """
+    import selectors
+    from daemon import write_raw, record_relay
+    targets = {process.stdout.fileno(): sys.stdout, process.stderr.fileno(): sys.stderr}
+    with selectors.DefaultSelector() as selector:
+        for fd in targets:
+            selector.register(fd, selectors.EVENT_READ)
+        while selector.get_map():
+            for key, _ in selector.select():
+                received = time.perf_counter()
+                data = os.read(key.fd, RELAY_READ_SIZE)
+                if not data:
+                    selector.unregister(key.fd)
+                    continue
+                target = targets[key.fd]
+                if target is sys.stdout:
+                    timings.setdefault("first_output", received)
+                write_raw(target, data)
+                record_relay(timings, received, len(data))
+    process.stdout.close()
+    process.stderr.close()
+
+def emit_skill_timing(command: str, mode: str, exit_code: int, timings: dict, session_id: str):
+    """
+    Emits a SkillTiming event describing how long the dispatch and the skill took.
+    """
+    from emitter import create_event, emit_event
+    start = timings["start"]
+    def since_start(key):
+        return round((timings[key] - start) * 1000, 2) if key in timings else None
+    relay_ms = timings.get("relay_ms", [])
 
-    except FileNotFoundError:
-        print(f"Error: '{sys.executable}' interpreter not found. Please make sure Python 3 is installed and in your PATH.")
-        sys.exit(1)
+    event = create_event(
+        source_app="pai-cli",
+        hook_event_type="SkillTiming",
+        payload={
+            "skill": command,
+            "mode": mode,
+            "exit_code": exit_code,
+            "spawn_ms": since_start("spawned"),
+            "first_output_ms": since_start("first_output"),
+            "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+            # Delay the CLI itself added between a chunk becoming readable and writing it out
+            "relay_chunks": len(relay_ms),
+            "relay_bytes": timings.get("relay_bytes", 0),
+            "relay_mean_ms": round(sum(relay_ms) / len(relay_ms), 3) if relay_ms else None,
+            "relay_max_ms": round(max(relay_ms), 3) if relay_ms else None,
+        },
+        session_id=session_id
+    )
+    emit_event(event)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,239 @@
+import os
+import sys
+import json
+import hashlib
+import threading
+
+SNAPSHOT_VERSION = 1
+PAI_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(PAI_PACKAGE_DIR)
+
+def get_source_dirs() -> dict:
+    """
+    Directories the registry compiles, by section.
+    """
+    return {
+        "agents": os.environ.get('PAI_AGENTS_DIR', os.path.join(REPO_ROOT, '.claude', 'agents')),
+        "contexts": os.path.join(PAI_PACKAGE_DIR, 'context'),
+        "skills": os.path.join(PAI_PACKAGE_DIR, 'skills'),
+    }
+
+def get_snapshot_dir() -> str:
+    """
+    Where the compiled sections are kept, one snapshot file per section.
+    """
+    pai_dir = os.environ.get('PAI_DIR', os.path.join(os.path.expanduser('~'), '.claude'))
+    return os.path.join(pai_dir, 'cache', 'prompt-registry')
+
+def _parse_value(value: str):
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in ('"', "'"):
+        return value[1:-1]
+    if value.startswith('[') and value.endswith(']'):
+        return [_parse_value(item) for item in value[1:-1].split(',') if item.strip()]
+    if value.lower() in ('true', 'false'):
+        return value.lower() == 'true'
+    return value
+
+def parse_frontmatter(text: str):
+    """
+    Splits a markdown document into (metadata, body).
+    Understands the subset of YAML used in agent files: scalars, inline lists and "- item" lists.
+    """
+    lines = text.splitlines(keepends=True)
+    if not lines or lines[0].strip() != '---':
+        return {}, text
+
+    metadata = {}
+    current_key = None
+    for index, line in enumerate(lines[1:], start=1):
+        stripped = line.strip()
+        if stripped == '---':
+            return metadata, "".join(lines[index + 1:])
+        if not stripped or stripped.startswith('#'):
+            continue
+        if stripped.startswith('- ') and current_key is not None:
+            if not isinstance(metadata.get(current_key), list):
+                metadata[current_key] = []
+            metadata[current_key].append(_parse_value(stripped[2:]))
+            continue
+        key, sep, value = line.partition(':')
+        if sep and not line[0].isspace():
+            current_key = key.strip()
+            metadata[current_key] = _parse_value(value) if value.strip() else []
+    # No closing delimiter: treat the whole file as the body
+    return {}, text
+
+def _fingerprint(path: str, stat_result: os.stat_result) -> dict:
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    return {"mtime_ns": stat_result.st_mtime_ns, "size": stat_result.st_size, "sha256": digest}
+
+def _compile_markdown(path: str) -> dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        metadata, body = parse_frontmatter(f.read())
+    return {"path": path, "metadata": metadata, "body": body}
+
+
+class PromptRegistry:
+    """
+    Compiled view of agents, context files and skill names.
+
+    Each section is validated at most once per process: an unchanged directory
+    mtime means no files were added or removed, and files whose mtime changed
+    are only recompiled when their content hash differs too. The compiled
+    result is shared across processes through one JSON snapshot per section,
+    so looking up a skill name never reads the compiled agent bodies.
+    """
+    def __init__(self, snapshot_dir: str = None):
+        self.snapshot_dir = snapshot_dir or get_snapshot_dir()
+        self.source_dirs = get_source_dirs()
+        self.snapshot = {"sections": {}}
+        self.validated = set()
+        self.lock = threading.Lock()
+
+    def _snapshot_path(self, name: str) -> str:
+        return os.path.join(self.snapshot_dir, f"{name}.json")
+
+    def _load_section(self, name: str):
+        try:
+            with open(self._snapshot_path(name), 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            if snapshot.get("version") == SNAPSHOT_VERSION and snapshot.get("source_dir") == self.source_dirs[name]:
+                return snapshot["section"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+        return None
+
+    def _save_section(self, name: str):
+        snapshot_path = self._snapshot_path(name)
+        snapshot = {"version": SNAPSHOT_VERSION, "source_dir": self.source_dirs[name],
+                    "section": self.snapshot["sections"][name]}
+        try:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, snapshot_path)
+        except OSError as e:
+            print(f"Warning: Could not save prompt registry snapshot: {e}", file=sys.stderr)
+
+    def _section(self, name: str) -> dict:
+        with self.lock:
+            if name not in self.validated:
+                section = self._load_section(name)
+                if section is not None:
+                    self.snapshot["sections"][name] = section
+                if self._refresh(name):
+                    self._save_section(name)
+                self.validated.add(name)
+            return self.snapshot["sections"][name]
+
+    def _refresh(self, name: str) -> bool:
+        """
+        Brings one section up to date. Returns True if the snapshot changed.
+        """
+        directory = self.source_dirs[name]
+        section = self.snapshot["sections"].get(name)
+        try:
+            dir_mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            dir_mtime = None
+
+        changed = False
+        if section is None or section.get("dir_mtime_ns") != dir_mtime:
+            section = self._rescan(name, directory, section or {"entries": {}})
+            section["dir_mtime_ns"] = dir_mtime
+            self.snapshot["sections"][name] = section
+            changed = True
+
+        if name == "skills":
+            # Skills are resolved by name only; the directory listing is all we need
+            return changed
+
+        for entry_name, entry in list(section["entries"].items()):
+            path = entry["path"]
+            try:
+                stat_result = os.stat(path)
+            except OSError:
+                del section["entries"][entry_name]
+                changed = True
+                continue
+            source = entry["source"]
+            if source["mtime_ns"] == stat_result.st_mtime_ns and source["size"] == stat_result.st_size:
+                continue
+            fingerprint = _fingerprint(path, stat_result)
+            if fingerprint["sha256"] != source["sha256"]:
+                section["entries"][entry_name] = dict(_compile_markdown(path), source=fingerprint)
+            else:
+                entry["source"] = fingerprint
+            changed = True
+        return changed
+
+    def _rescan(self, name: str, directory: str, section: dict) -> dict:
+        try:
+            filenames = sorted(os.listdir(directory))
+        except OSError:
+            filenames = []
+
+        if name == "skills":
+            skills = [f[:-3] for f in filenames if f.endswith('.py') and not f.startswith('_')]
+            return {"entries": {skill: {} for skill in skills}}
+
+        entries = {}
+        old_entries = section.get("entries", {})
+        for filename in filenames:
+            if not filename.endswith('.md'):
+                continue
+            entry_name = filename[:-3]
+            path = os.path.join(directory, filename)
+            if entry_name in old_entries:
+                # Kept as-is; the per-file check in _refresh recompiles it if it changed
+                entries[entry_name] = old_entries[entry_name]
+                continue
+            try:
+                stat_result = os.stat(path)
+                entries[entry_name] = dict(_compile_markdown(path), source=_fingerprint(path, stat_result))
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"Warning: Could not compile '{path}': {e}", file=sys.stderr)
+        return {"entries": entries}
+
+    def list_skills(self) -> list:
+        return sorted(self._section("skills")["entries"])
+
+    def has_skill(self, name: str) -> bool:
+        return name in self._section("skills")["entries"]
+
+    def list_agents(self) -> list:
+        return sorted(self._section("agents")["entries"])
+
+    def get_agent(self, name: str):
+        """
+        Returns {"path", "metadata", "body"} for an agent, or None if it does not exist.
+        """
+        return self._section("agents")["entries"].get(name)
+
+    def list_contexts(self) -> list:
+        return sorted(self._section("contexts")["entries"])
+
+    def get_context(self, name: str):
+        return self._section("contexts")["entries"].get(name)
+
+
+_registry = None
+
+def get_registry() -> PromptRegistry:
+    """
+    Returns the process-wide prompt registry.
+    """
+    global _registry
+    if _registry is None:
+        _registry = PromptRegistry()
+    return _registry
+
+if __name__ == '__main__':
+    registry = get_registry()
+    print("Skills:", ", ".join(registry.list_skills()) or "(none)")
+    print("Agents:", ", ".join(registry.list_agents()) or "(none)")
+    print("Contexts:", ", ".join(registry.list_contexts()) or "(none)")
+    print(f"Snapshots: {registry.snapshot_dir}")
@@ -0,0 +1,271 @@
+import os
+import re
+import json
+import time
+import uuid
+import fcntl
+import argparse
+
+# Size of the blocks a session file is read in, newest first
+READ_BLOCK_SIZE = 65536
+
+# Session ids become file names, so they are restricted to a safe alphabet
+SESSION_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,128}$')
+
+SUMMARY_PROMPT = (
+    "Summarize the conversation below for your own future reference. Keep every fact, decision, "
+    "name and open question that a follow-up might depend on. Be concise; plain prose, no preamble."
+)
+
+def get_sessions_dir() -> str:
+    pai_dir = os.environ.get('PAI_DIR', os.path.join(os.path.expanduser('~'), '.claude'))
+    return os.path.join(pai_dir, 'sessions')
+
+def get_token_budget() -> int:
+    """
+    Tokens of earlier conversation sent along with a follow-up (PAI_SESSION_TOKEN_BUDGET).
+    """
+    return int(os.environ.get('PAI_SESSION_TOKEN_BUDGET', '4000'))
+
+def validate_session_id(session_id: str) -> str:
+    if not SESSION_ID_PATTERN.match(session_id or ''):
+        raise ValueError(f"Invalid session id '{session_id}': use letters, digits, '.', '_' or '-'.")
+    return session_id
+
+def get_session_path(session_id: str) -> str:
+    return os.path.join(get_sessions_dir(), f"{validate_session_id(session_id)}.jsonl")
+
+def resolve_session_id(value: str) -> str:
+    """
+    The session a --session flag refers to: the given id, or for --new-session (no id) a new
+    one, which is the CLI's own session id when run through `pai`.
+    """
+    if value:
+        return validate_session_id(value)
+    return os.environ.get('PAI_SESSION_ID') or uuid.uuid4().hex
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count (about four characters per token), good enough for budgeting.
+    """
+    return (len(text or '') + 3) // 4 + 4
+
+def iter_records_reversed(session_id: str):
+    """
+    Yields a session's records newest first, reading the file backwards one block at a time,
+    so only as much of a long history is read as the caller consumes.
+    """
+    try:
+        f = open(get_session_path(session_id), 'rb')
+    except FileNotFoundError:
+        return
+    with f:
+        position = f.seek(0, os.SEEK_END)
+        tail = b''
+        while position > 0:
+            size = min(READ_BLOCK_SIZE, position)
+            position -= size
+            f.seek(position)
+            lines = (f.read(size) + tail).split(b'\n')
+            # The first piece may be the end of a line that starts in the previous block
+            tail = lines.pop(0)
+            for line in reversed(lines):
+                record = _parse_record(line)
+                if record is not None:
+                    yield record
+        record = _parse_record(tail)
+        if record is not None:
+            yield record
+
+def _parse_record(line: bytes):
+    if not line.strip():
+        return None
+    try:
+        return json.loads(line)
+    except ValueError:
+        # A torn final line from an interrupted write
+        return None
+
+def _append_records(session_id: str, build_records):
+    """
+    Appends the records returned by `build_records(last_seq)` in a single write, under the session's lock.
+    """
+    path = get_session_path(session_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.lock', 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        last_seq = next((r["seq"] for r in iter_records_reversed(session_id) if r.get("type") == "turn"), 0)
+        records = build_records(last_seq)
+        data = b''.join(json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n' for record in records)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+def append_exchange(session_id: str, user_prompt: str, answer: str, agent: str = None):
+    """
+    Records one question and its answer as two turns of the session.
+    """
+    def build(last_seq):
+        now = int(time.time())
+        turns = [
+            {"type": "turn", "seq": last_seq + 1, "role": "user", "content": user_prompt, "ts": now},
+            {"type": "turn", "seq": last_seq + 2, "role": "assistant", "content": answer, "ts": now},
+        ]
+        if agent:
+            for turn in turns:
+                turn["agent"] = agent
+        return turns
+    _append_records(session_id, build)
+
+def _recent_turns(session_id: str, budget: int):
+    """
+    Reads back from the newest record until the budget is spent or the latest summary is reached.
+    Returns (summary record or None, kept turns newest first, whether older uncovered turns remain).
+    """
+    turns = []
+    summary = None
+    used = 0
+    truncated = False
+    for record in iter_records_reversed(session_id):
+        if record.get("type") == "summary":
+            if summary is None:
+                summary = record
+            continue
+        if record.get("type") != "turn":
+            continue
+        if summary is not None and record["seq"] <= summary["through"]:
+            break
+        cost = estimate_tokens(record["content"])
+        if used + cost > budget:
+            truncated = True
+            break
+        turns.append(record)
+        used += cost
+
+    # A follow-up reads best when the kept history starts with a question
+    while turns and turns[-1]["role"] != "user":
+        used -= estimate_tokens(turns.pop()["content"])
+        truncated = True
+
+    if summary is not None:
+        # Make room for the summary by giving up the oldest verbatim exchanges, but keep the last one
+        while len(turns) > 2 and used + estimate_tokens(summary["content"]) > budget:
+            for _ in range(2):
+                used -= estimate_tokens(turns.pop()["content"])
+            truncated = True
+    return summary, turns, truncated
+
+def load_history(session_id: str, budget: int = None) -> dict:
+    """
+    The most recent turns that fit in `budget` tokens, preceded by the latest summary when it
+    fits too; a summary stands in for every turn up to its "through" sequence number.
+    Returns {"messages", "truncated"}, where "truncated" means older turns were left out.
+    """
+    budget = get_token_budget() if budget is None else budget
+    summary, turns, truncated = _recent_turns(session_id, budget)
+    used = sum(estimate_tokens(turn["content"]) for turn in turns)
+
+    messages = []
+    if summary is not None and used + estimate_tokens(summary["content"]) <= budget:
+        messages.append({"role": "system", "content": f"Summary of the conversation so far:\n{summary['content']}"})
+    messages.extend({"role": turn["role"], "content": turn["content"]} for turn in reversed(turns))
+    return {"messages": messages, "truncated": truncated}
+
+def build_messages(system_prompt: str, user_prompt: str, session_id: str = None, budget: int = None) -> list:
+    """
+    The generation messages for a prompt, with the session's recent history in between when resuming.
+    """
+    history = load_history(session_id, budget)["messages"] if session_id else []
+    return [{"role": "system", "content": system_prompt}] + history + [{"role": "user", "content": user_prompt}]
+
+async def summarize_older_turns(session_id: str, budget: int = None) -> bool:
+    """
+    Folds the turns that no longer fit the budget, and any earlier summary, into a new summary
+    record, so later loads stop there instead of dropping them silently.
+    Returns True if a summary was written.
+    """
+    budget = get_token_budget() if budget is None else budget
+    previous, kept, truncated = _recent_turns(session_id, budget)
+    if not truncated:
+        return False
+
+    # Everything between the previous summary and the turns kept verbatim
+    oldest_kept = kept[-1]["seq"] if kept else None
+    older = []
+    for record in iter_records_reversed(session_id):
+        if record.get("type") != "turn" or (oldest_kept is not None and record["seq"] >= oldest_kept):
+            continue
+        if previous is not None and record["seq"] <= previous["through"]:
+            break
+        older.append(record)
+    if not older:
+        return False
+    older.reverse()
+
+    transcript = "\n\n".join(f"{turn['role'].upper()}: {turn['content']}" for turn in older)
+    if previous is not None:
+        transcript = f"EARLIER SUMMARY: {previous['content']}\n\n{transcript}"
+
+    from .llm_utils import acall_llm, is_error_response
+    content = await acall_llm([
+        {"role": "system", "content": SUMMARY_PROMPT},
+        {"role": "user", "content": transcript},
+    ], stream=False)
+    if is_error_response(content):
+        return False
+
+    through = older[-1]["seq"]
+    _append_records(session_id, lambda last_seq: [
+        {"type": "summary", "through": through, "content": content.strip(), "ts": int(time.time())}
+    ])
+    return True
+
+def list_sessions() -> list:
+    """
+    Returns (session_id, modified time, size in bytes) for every stored session, most recent first.
+    """
+    sessions = []
+    try:
+        entries = list(os.scandir(get_sessions_dir()))
+    except FileNotFoundError:
+        return []
+    for entry in entries:
+        if entry.name.endswith('.jsonl'):
+            stat = entry.stat()
+            sessions.append((entry.name[:-len('.jsonl')], stat.st_mtime, stat.st_size))
+    return sorted(sessions, key=lambda item: item[1], reverse=True)
+
+def delete_session(session_id: str) -> bool:
+    path = get_session_path(session_id)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return False
+    try:
+        os.remove(path + '.lock')
+    except FileNotFoundError:
+        pass
+    return True
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Inspect or manage stored conversation sessions.")
+    parser.add_argument("action", choices=["list", "show", "delete"], help="What to do.")
+    parser.add_argument("session_id", nargs='?', help="Session to show or delete.")
+    parser.add_argument("--budget", type=int, default=None, help="Token budget used by 'show'.")
+    args = parser.parse_args()
+
+    if args.action == "list":
+        for session_id, mtime, size in list_sessions():
+            print(f"{session_id}  {time.strftime('%Y-%m-%d %H:%M', time.localtime(mtime))}  {size} bytes")
+    elif not args.session_id:
+        parser.error(f"'{args.action}' needs a session id")
+    elif args.action == "show":
+        history = load_history(args.session_id, args.budget)
+        for message in history["messages"]:
+            print(f"[{message['role']}] {message['content']}\n")
+        if history["truncated"]:
+            print("(older turns fall outside the budget)")
+    elif args.action == "delete":
+        print("Deleted." if delete_session(args.session_id) else "No such session.")
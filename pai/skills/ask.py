@@ -1,69 +1,182 @@
-import os
 import sys
+import time
+import asyncio
 import argparse
-from ..llm_utils import call_llm
+from ..llm_utils import acall_llm, is_error_response
+from ..prompts import get_registry
+from .. import sessions
 
 def load_context(context_name: str) -> str:
     """
-    Loads a specific context file from the context directory.
+    Loads a specific context file from the context directory, via the prompt registry.
     """
     try:
-        context_path = os.path.join(os.path.dirname(__file__), '..', 'context', f"{context_name}.md")
-        with open(context_path, 'r', encoding='utf-8') as f:
-            return f.read()
-    except FileNotFoundError:
-        print(f"Warning: {context_name}.md not found. Proceeding without this context.", file=sys.stderr)
-        return ""
+        context = get_registry().get_context(context_name)
     except Exception as e:
         print(f"Error loading context '{context_name}': {e}", file=sys.stderr)
         return ""
+    if context is None:
+        print(f"Warning: {context_name}.md not found. Proceeding without this context.", file=sys.stderr)
+        return ""
+    return context["body"]
+
+def build_validation_messages(user_prompt: str, answer: str) -> list:
+    validator_context = load_context("validator")
+    validation_prompt = f"Original Question: \"{user_prompt}\"\n\nResponse to Validate: \"{answer}\""
+    return [
+        {"role": "system", "content": validator_context},
+        {"role": "user", "content": validation_prompt}
+    ]
+
+def parse_validation(validation_result: str) -> str:
+    """
+    Reduces the validator's reply to VALID, INVALID or UNKNOWN.
+    """
+    validation_result = (validation_result or "").strip().upper()
+    # Clean up validation result to be robust
+    if "INVALID" in validation_result:
+        return "INVALID"
+    elif "VALID" in validation_result:
+        return "VALID"
+    return "UNKNOWN" # Fallback if the validator doesn't behave
+
+def add_session_arguments(parser: argparse.ArgumentParser):
+    """
+    Flags for resuming a stored conversation, shared by ask and run_agent.
+    """
+    # --session always takes an ID, so it can never swallow the first word of the prompt
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--session", default=None, metavar="ID",
+                       help="Continue the stored conversation ID (created if it does not exist yet).")
+    group.add_argument("--new-session", action="store_true",
+                       help="Start a new stored conversation; its ID is printed on stderr.")
+    parser.add_argument("--context-budget", type=int, default=None,
+                        help="Tokens of earlier conversation to send (default: PAI_SESSION_TOKEN_BUDGET or 4000).")
+    parser.add_argument("--summarize", action="store_true",
+                        help="After answering, fold turns that no longer fit the budget into a summary.")
+
+def open_session(args) -> str:
+    """
+    Resolves --session/--new-session to a session id, announcing new ones on stderr so they can be resumed.
+    """
+    if args.session is None and not args.new_session:
+        return None
+    try:
+        session_id = sessions.resolve_session_id(args.session)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    if args.new_session:
+        print(f"[SESSION: {session_id}]", file=sys.stderr)
+    return session_id
+
+def remember(session_id: str, user_prompt: str, answer: str, agent: str = None):
+    if session_id and not is_error_response(answer):
+        sessions.append_exchange(session_id, user_prompt, answer, agent=agent)
+
+def finish_session(session_id: str, args):
+    if session_id and args.summarize:
+        asyncio.run(sessions.summarize_older_turns(session_id, args.context_budget))
+
+def report_timings(timings: dict):
+    parts = " ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in timings.items())
+    print(f"[TIMING] {parts}", file=sys.stderr)
+
+async def stream_and_validate(user_prompt: str, generation_messages: list, validate: bool = True,
+                              session_id: str = None) -> dict:
+    """
+    Streams the answer to stdout as it arrives, then validates the complete answer.
+    Validation cannot start before the answer is complete, so total time is still answer plus
+    validation; the gain is that the verdict comes as a trailer and never delays the first token.
+    """
+    start = time.perf_counter()
+    timings = {}
+    chunks = []
+
+    stream = await acall_llm(generation_messages, stream=True)
+    async for chunk in stream:
+        if "ttft" not in timings:
+            timings["ttft"] = time.perf_counter() - start
+        chunks.append(chunk)
+        print(chunk, end='', flush=True)
+    timings["answer"] = time.perf_counter() - start
+    remember(session_id, user_prompt, "".join(chunks))
+
+    if validate:
+        print(flush=True) # finish the answer line before the validator runs
+        validation_status = parse_validation(
+            await acall_llm(build_validation_messages(user_prompt, "".join(chunks)), stream=False)
+        )
+        timings["validation"] = time.perf_counter() - start - timings["answer"]
+        print(f"[VALIDATION: {validation_status}]", flush=True)
+    else:
+        print() # for a final newline
+
+    timings["total"] = time.perf_counter() - start
+    return timings
+
+async def answer_prompt(user_prompt: str, validate: bool = True, session_id: str = None,
+                        context_budget: int = None, skill: str = None) -> dict:
+    """
+    Generates an answer and, optionally, validates it. Used by main() and by `pai batch`.
+    With a session_id, the conversation so far is sent along and the exchange is recorded.
+    `skill` picks the model list when not running as the `ask` command itself (e.g. in a batch).
+    """
+    start = time.perf_counter()
+    # 1. Generate the initial answer
+    generation_messages = sessions.build_messages(load_context("personality"), user_prompt, session_id, context_budget)
+    answer = await acall_llm(generation_messages, stream=False, skill=skill)
+    timings = {"answer": time.perf_counter() - start}
+    remember(session_id, user_prompt, answer)
+
+    # 2. Validate the answer
+    validation_status = None
+    if validate:
+        validation_status = parse_validation(
+            await acall_llm(build_validation_messages(user_prompt, answer), stream=False, skill=skill)
+        )
+        timings["validation"] = time.perf_counter() - start - timings["answer"]
+
+    return {"answer": answer, "validation": validation_status, "timings": timings}
 
 def main():
     """
     Main execution flow: get answer, optionally validate it, and print the result.
     """
     parser = argparse.ArgumentParser(description="Ask the PAI a question.")
-    parser.add_argument("--stream", action="store_true", help="Enable streaming response.")
+    parser.add_argument("--stream", action="store_true", help="Stream the answer and append the validation verdict as a trailer.")
+    parser.add_argument("--no-validate", action="store_true", help="Skip validation of the answer.")
+    parser.add_argument("--timings", action="store_true", help="Report time-to-first-token and wall time on stderr.")
+    add_session_arguments(parser)
     parser.add_argument("prompt", nargs='+', help="The prompt to send to the PAI.")
     args = parser.parse_args()
 
     user_prompt = " ".join(args.prompt)
-
-    # 1. Generate the initial answer
-    personality_context = load_context("personality")
-    generation_messages = [
-        {"role": "system", "content": personality_context},
-        {"role": "user", "content": user_prompt}
-    ]
+    session_id = open_session(args)
 
     if args.stream:
-        # Stream the response directly to stdout
-        for chunk in call_llm(generation_messages, stream=True):
-            print(chunk, end='', flush=True)
-        print() # for a final newline
+        # Stream the response directly to stdout, validating once it is complete
+        generation_messages = sessions.build_messages(load_context("personality"), user_prompt,
+                                                      session_id, args.context_budget)
+        timings = asyncio.run(stream_and_validate(user_prompt, generation_messages,
+                                                  validate=not args.no_validate, session_id=session_id))
     else:
-        # Get the full response and then validate it
-        initial_answer = call_llm(generation_messages, stream=False)
-
-        # 2. Validate the answer
-        validator_context = load_context("validator")
-        validation_prompt = f"Original Question: \"{user_prompt}\"\n\nResponse to Validate: \"{initial_answer}\""
-        validation_messages = [
-            {"role": "system", "content": validator_context},
-            {"role": "user", "content": validation_prompt}
-        ]
-        validation_result = call_llm(validation_messages, stream=False).strip().upper()
-
-        # Clean up validation result to be robust
-        if "INVALID" in validation_result:
-            validation_status = "INVALID"
-        elif "VALID" in validation_result:
-            validation_status = "VALID"
-        else:
-            validation_status = "UNKNOWN" # Fallback if the validator doesn't behave
+        start = time.perf_counter()
+        result = asyncio.run(answer_prompt(user_prompt, validate=not args.no_validate,
+                                           session_id=session_id, context_budget=args.context_budget))
+        timings = result["timings"]
 
         # 3. Print the final, observable output
-        print(f"[VALIDATION: {validation_status}] {initial_answer}")
+        if result["validation"]:
+            print(f"[VALIDATION: {result['validation']}] {result['answer']}")
+        else:
+            print(result["answer"])
+        # Nothing reaches the user before the whole pipeline finishes
+        timings["ttft"] = timings["total"] = time.perf_counter() - start
+
+    if args.timings:
+        report_timings(timings)
+    finish_session(session_id, args)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,208 @@
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+from ..emitter import create_event, emit_event
+from ..llm_utils import is_error_response
+
+PROMPT_FIELDS = ("prompt", "body", "question", "text")
+ID_FIELDS = ("id", "request_id")
+
+class RateLimiter:
+    """
+    Spaces request starts so that no more than `rate` begin per second.
+    """
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+def load_completed_ids(output_path: str) -> set:
+    """
+    Reads the output file of a previous run and returns the ids that already succeeded.
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by a crash; that item will simply run again
+                continue
+            if record.get("status") == "ok":
+                completed.add(record.get("id"))
+    return completed
+
+def terminate_partial_line(path: str, output_file):
+    """
+    A run that crashed mid-write leaves a fragment without its newline. Ends it, so the first new
+    record starts on its own line instead of being glued to the fragment and lost on resume.
+    """
+    try:
+        with open(path, 'rb') as f:
+            if f.seek(0, os.SEEK_END) == 0:
+                return
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) == b'\n':
+                return
+    except OSError:
+        return
+    output_file.write('\n')
+    output_file.flush()
+
+def iter_items(input_path: str, id_field: str = None, prompt_field: str = None):
+    """
+    Streams (id, prompt, record) tuples from a JSONL file without loading it whole.
+    """
+    with open(input_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                print(f"Warning: Skipping invalid JSON on line {line_number}.", file=sys.stderr)
+                continue
+            if isinstance(record, str):
+                record = {"prompt": record}
+
+            item_id = None
+            for field in ([id_field] if id_field else ID_FIELDS):
+                if record.get(field) is not None:
+                    item_id = str(record[field])
+                    break
+            if item_id is None:
+                item_id = f"line-{line_number}"
+
+            prompt = None
+            for field in ([prompt_field] if prompt_field else PROMPT_FIELDS):
+                if record.get(field):
+                    prompt = str(record[field])
+                    break
+            if prompt is None:
+                print(f"Warning: No prompt found for '{item_id}', skipping.", file=sys.stderr)
+                continue
+            yield item_id, prompt, record
+
+def make_runner(skill: str, agent_name: str = None, validate: bool = True):
+    """
+    Returns a coroutine function that runs one prompt through the chosen skill in-process.
+    """
+    if skill == "ask":
+        from .ask import answer_prompt
+        # Model lists and LLMCall events belong to the batched skill, not to `batch`
+        return lambda prompt: answer_prompt(prompt, validate=validate, skill="ask")
+    if skill == "run_agent":
+        from .run_agent import load_agent_prompt, answer_prompt
+        if not agent_name:
+            print("Error: run_agent batches need --agent.", file=sys.stderr)
+            sys.exit(1)
+        # The agent prompt is the same for every item, so it is loaded once
+        system_prompt = load_agent_prompt(agent_name)
+        if not system_prompt:
+            sys.exit(1)
+        return lambda prompt: answer_prompt(system_prompt, prompt, skill="run_agent")
+    print(f"Error: Skill '{skill}' does not support batch mode. Use 'ask' or 'run_agent'.", file=sys.stderr)
+    sys.exit(1)
+
+async def run_batch(items, run_prompt, output_file, workers: int, rate: float) -> dict:
+    """
+    Runs prompts with `workers` concurrent tasks, appending each result to the output as it finishes.
+    """
+    queue = asyncio.Queue(maxsize=workers * 2)
+    limiter = RateLimiter(rate)
+    counts = {"ok": 0, "error": 0}
+
+    async def producer():
+        for item in items:
+            await queue.put(item)
+        for _ in range(workers):
+            await queue.put(None)
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            item_id, prompt, _ = item
+            await limiter.wait()
+            start = time.perf_counter()
+            try:
+                result = await run_prompt(prompt)
+                status = "error" if is_error_response(result.get("answer")) else "ok"
+            except Exception as e:
+                result = {"error": str(e)}
+                status = "error"
+            record = {"id": item_id, "status": status, "duration": round(time.perf_counter() - start, 3)}
+            record.update(result)
+            output_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            # Flushed per record so a crash loses at most the items still in flight
+            output_file.flush()
+            counts[status] += 1
+
+    await asyncio.gather(producer(), *(worker() for _ in range(workers)))
+    return counts
+
+def main():
+    """
+    Runs a skill over every prompt in a JSONL file.
+    """
+    parser = argparse.ArgumentParser(description="Run a skill over a JSONL file of prompts.")
+    parser.add_argument("skill", choices=["ask", "run_agent"], help="The skill to run for each prompt.")
+    parser.add_argument("input", help="JSONL file with one prompt per line.")
+    parser.add_argument("-o", "--output", default=None, help="Output JSONL file (default: <input>.out.jsonl). Existing successful ids are skipped.")
+    parser.add_argument("--workers", type=int, default=8, help="Number of prompts processed concurrently.")
+    parser.add_argument("--rate", type=float, default=0, help="Maximum prompts started per second (0 = unlimited).")
+    parser.add_argument("--agent", default=None, help="Agent name for run_agent batches.")
+    parser.add_argument("--id-field", default=None, help="Field holding the item id (default: id, then request_id, then the line number).")
+    parser.add_argument("--prompt-field", default=None, help="Field holding the prompt (default: prompt, body, question or text).")
+    parser.add_argument("--no-validate", action="store_true", help="Skip validation for ask batches.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Error: Input file '{args.input}' not found.", file=sys.stderr)
+        sys.exit(1)
+
+    output_path = args.output or f"{os.path.splitext(args.input)[0]}.out.jsonl"
+    completed = load_completed_ids(output_path)
+    if completed:
+        print(f"Resuming: {len(completed)} item(s) already done in {output_path}.", file=sys.stderr)
+
+    run_prompt = make_runner(args.skill, args.agent, validate=not args.no_validate)
+    items = (item for item in iter_items(args.input, args.id_field, args.prompt_field) if item[0] not in completed)
+
+    # The whole batch shares one session, reported once at the start and once at the end
+    session_id = os.environ.get("PAI_SESSION_ID") or str(uuid.uuid4())
+    # Exported so the LLMCall events of every item land in the batch's session too
+    os.environ["PAI_SESSION_ID"] = session_id
+    batch_info = {"skill": args.skill, "input": args.input, "output": output_path, "workers": args.workers, "rate": args.rate}
+    emit_event(create_event("pai-batch", "BatchStart", dict(batch_info, skipped=len(completed)), session_id=session_id))
+
+    start = time.perf_counter()
+    with open(output_path, 'a', encoding='utf-8') as output_file:
+        terminate_partial_line(output_path, output_file)
+        counts = asyncio.run(run_batch(items, run_prompt, output_file, max(1, args.workers), args.rate))
+    duration = time.perf_counter() - start
+
+    emit_event(create_event("pai-batch", "BatchComplete", dict(batch_info, duration=round(duration, 3), **counts), session_id=session_id))
+    print(f"Batch finished in {duration:.1f}s: {counts['ok']} ok, {counts['error']} error(s). Results in {output_path}.", file=sys.stderr)
+    if counts["error"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import sys
+import argparse
+from ..event_index import parse_time, query_events, rebuild_indexes
+
+def main():
+    """
+    Queries the event history written by the emitter, using the sidecar indexes.
+    """
+    parser = argparse.ArgumentParser(description="Query PAI event logs.")
+    parser.add_argument("--session", help="Only events with this session_id.")
+    parser.add_argument("--type", dest="event_type", help="Only events with this hook_event_type (e.g. ExecuteSkill:ask).")
+    parser.add_argument("--since", help="Start of the time range: epoch seconds, ISO date, or an age like 24h / 30d.")
+    parser.add_argument("--until", help="End of the time range, in the same formats as --since.")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many events.")
+    parser.add_argument("--count", action="store_true", help="Print only the number of matching events.")
+    parser.add_argument("--reindex", action="store_true", help="Drop the existing indexes and rebuild them.")
+    args = parser.parse_args()
+
+    try:
+        since = parse_time(args.since) if args.since else None
+        until = parse_time(args.until) if args.until else None
+    except ValueError as e:
+        print(f"Error: Invalid time filter: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.reindex:
+        removed = rebuild_indexes()
+        print(f"Removed {removed} index file(s); rebuilding.", file=sys.stderr)
+
+    matches = query_events(
+        session_id=args.session,
+        event_type=args.event_type,
+        since=since,
+        until=until,
+        limit=args.limit,
+    )
+
+    if args.count:
+        print(sum(1 for _ in matches))
+        return
+
+    out = sys.stdout.buffer
+    for line in matches:
+        out.write(line + b'\n')
+    out.flush()
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,35 @@
-import os
 import sys
 import argparse
-from ..llm_utils import call_llm
+from ..llm_utils import call_llm, acall_llm
+from ..prompts import get_registry
+from .. import sessions
+from .ask import add_session_arguments, open_session, remember, finish_session
 
 def load_agent_prompt(agent_name: str) -> str:
     """
-    Loads the system prompt from an agent's markdown file.
+    Loads the system prompt (the body after the frontmatter) of an agent, via the prompt registry.
     """
     try:
-        # Assumes the script is run from the repo root or pai/ directory
-        agent_path = os.path.join(os.path.dirname(__file__), '..', '..', '.claude', 'agents', f"{agent_name}.md")
-        with open(agent_path, 'r', encoding='utf-8') as f:
-            # Simple parsing: skip frontmatter
-            in_frontmatter = True
-            prompt_lines = []
-            for line in f:
-                if in_frontmatter and line.strip() == '---':
-                    in_frontmatter = False
-                    # This is the second '---', so we start reading after this.
-                    continue
-                if not in_frontmatter:
-                    prompt_lines.append(line)
-            return "".join(prompt_lines)
-
-    except FileNotFoundError:
-        print(f"Error: Agent '{agent_name}.md' not found.", file=sys.stderr)
-        return ""
+        agent = get_registry().get_agent(agent_name)
     except Exception as e:
         print(f"Error loading agent '{agent_name}': {e}", file=sys.stderr)
         return ""
+    if agent is None:
+        print(f"Error: Agent '{agent_name}.md' not found.", file=sys.stderr)
+        return ""
+    return agent["body"]
+
+async def answer_prompt(system_prompt: str, user_prompt: str, session_id: str = None,
+                        context_budget: int = None, agent_name: str = None, skill: str = None) -> dict:
+    """
+    Sends one prompt to an agent whose system prompt is already loaded. Used by `pai batch`.
+    With a session_id, the conversation so far is sent along and the exchange is recorded.
+    `skill` picks the model list when not running as the `run_agent` command itself.
+    """
+    generation_messages = sessions.build_messages(system_prompt, user_prompt, session_id, context_budget)
+    answer = await acall_llm(generation_messages, stream=False, skill=skill)
+    remember(session_id, user_prompt, answer, agent=agent_name)
+    return {"answer": answer}
 
 def main():
     """
@@ -38,6 +39,7 @@ def main():
     parser.add_argument("agent_name", help="The name of the agent to run.")
     parser.add_argument("prompt", nargs='+', help="The prompt to send to the agent.")
     parser.add_argument("--stream", action="store_true", help="Enable streaming response.")
+    add_session_arguments(parser)
     args = parser.parse_args()
 
     agent_name = args.agent_name
@@ -48,17 +50,22 @@ def main():
     if not system_prompt:
         sys.exit(1)
 
-    generation_messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": user_prompt}
-    ]
+    session_id = open_session(args)
+    generation_messages = sessions.build_messages(system_prompt, user_prompt, session_id, args.context_budget)
 
     if args.stream:
+        chunks = []
         for chunk in call_llm(generation_messages, stream=True):
+            chunks.append(chunk)
             print(chunk, end='', flush=True)
         print()
+        answer = "".join(chunks)
     else:
-        print(call_llm(generation_messages, stream=False))
+        answer = call_llm(generation_messages, stream=False)
+        print(answer)
+
+    remember(session_id, user_prompt, answer, agent=agent_name)
+    finish_session(session_id, args)
 
 
 if __name__ == "__main__":
@@ -2,34 +2,311 @@
 # It follows the existing architectural pattern of other skills, which are invoked directly
 # rather than being instantiated as classes.
 
-import cv2
 import os
-import tempfile
+import sys
+import glob
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
 
-def analyze_emotion(image_path):
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+# Input size and per-channel (RGB) normalization applied before batch analysis
+MODEL_INPUT_SIZE = (224, 224)
+NORMALIZE_MEAN = (0.485, 0.456, 0.406)
+NORMALIZE_STD = (0.229, 0.224, 0.225)
+
+# OpenCV and NumPy are imported on first use, so `--help` and importing the skill stay cheap
+cv2 = None
+np = None
+
+def preload():
+    """
+    Imports OpenCV and NumPy. Called before any frame work, and by the daemon to keep workers warm.
+    """
+    global cv2, np
+    if cv2 is None:
+        import cv2 as cv2_module
+        import numpy as numpy_module
+        cv2, np = cv2_module, numpy_module
+
+def score_emotions(image) -> dict:
     """
     Placeholder for Hume AI emotion analysis.
+    `image` is either a file path or JPEG-encoded bytes.
     In the future, this function will use the Hume AI SDK to analyze the image.
     """
     # Mock analysis result
-    mock_emotions = {
+    return {
         "Joy": 0.7,
         "Sadness": 0.1,
         "Surprise": 0.2,
     }
 
+def score_emotions_batch(batch: "np.ndarray") -> list:
+    """
+    Placeholder for batched Hume AI emotion analysis.
+    `batch` is a normalized float32 array of shape (N, H, W, 3) in RGB order.
+    """
+    return [score_emotions(None) for _ in range(batch.shape[0])]
+
+def format_analysis(emotions: dict) -> str:
     analysis_text = "Detected emotions:\n"
-    for emotion, score in mock_emotions.items():
+    for emotion, score in emotions.items():
         analysis_text += f"- {emotion}: {score*100:.1f}%\n"
-
     return analysis_text
 
-def main():
+def analyze_emotion(image):
+    """
+    Analyzes an image (path or JPEG bytes) and returns a readable summary.
+    """
+    return format_analysis(score_emotions(image))
+
+def encode_frame(frame, quality: int = 90) -> bytes:
+    """
+    JPEG-encodes a frame in memory.
+    """
+    preload()
+    ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("Could not encode frame.")
+    return buffer.tobytes()
+
+def _analyze_frame_job(frame_index: int, jpeg_bytes: bytes):
+    """
+    Runs in a worker process. Returns the frame index, its scores and the analysis time.
+    """
+    start = time.perf_counter()
+    emotions = score_emotions(jpeg_bytes)
+    return frame_index, emotions, time.perf_counter() - start
+
+
+class ImageSequenceCapture:
+    """
+    Minimal stand-in for cv2.VideoCapture that reads a directory or glob of still images.
+    """
+    def __init__(self, paths: list):
+        self.paths = paths
+        self.position = 0
+
+    def isOpened(self):
+        return bool(self.paths)
+
+    def read(self):
+        while self.position < len(self.paths):
+            frame = cv2.imread(self.paths[self.position])
+            self.position += 1
+            if frame is not None:
+                return True, frame
+        return False, None
+
+    def release(self):
+        self.paths = []
+
+
+def open_source(source: str):
+    """
+    Opens a camera index ("0"), a video file, a directory of images or a glob pattern.
+    """
+    preload()
+    if source.isdigit():
+        cap = cv2.VideoCapture(int(source))
+        # Keep the driver from queueing frames, so each sample is as fresh as possible
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap
+    if os.path.isdir(source):
+        paths = sorted(os.path.join(source, name) for name in os.listdir(source) if name.lower().endswith(IMAGE_EXTENSIONS))
+        return ImageSequenceCapture(paths)
+    if any(char in source for char in '*?['):
+        return ImageSequenceCapture(sorted(glob.glob(source)))
+    return cv2.VideoCapture(source)
+
+def run_continuous(source: str, fps: float, workers: int, max_pending: int, max_frames: int = None, duration: float = None):
+    """
+    Keeps the source open, samples frames at `fps` and analyzes them on a process pool.
+    When the pool falls behind, queued frames that have not started yet are dropped in
+    favour of the newest one, so results never lag far behind the camera.
+    """
+    cap = open_source(source)
+    if not cap.isOpened():
+        print(f"Error: Could not open video source '{source}'.")
+        return
+
+    interval = 1.0 / fps if fps > 0 else 0.0
+    pending = {}  # future -> (frame index, capture time)
+    latencies = []
+    stats = {"captured": 0, "analyzed": 0, "dropped": 0}
+
+    def collect(done):
+        for future in done:
+            frame_index, captured_at = pending.pop(future)
+            if future.cancelled():
+                continue
+            _, emotions, analysis_time = future.result()
+            latency = time.perf_counter() - captured_at
+            latencies.append(latency)
+            stats["analyzed"] += 1
+            summary = ", ".join(f"{emotion} {score*100:.0f}%" for emotion, score in emotions.items())
+            print(f"[frame {frame_index}] latency={latency*1000:.1f}ms analysis={analysis_time*1000:.1f}ms {summary}", flush=True)
+
+    start = time.perf_counter()
+    next_sample = start
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while True:
+                if max_frames is not None and stats["captured"] >= max_frames:
+                    break
+                if duration is not None and time.perf_counter() - start >= duration:
+                    break
+
+                if interval:
+                    delay = next_sample - time.perf_counter()
+                    if delay > 0:
+                        # Use the idle time to pick up finished analyses
+                        collect(wait(list(pending), timeout=delay, return_when=FIRST_COMPLETED).done if pending else [])
+                        delay = next_sample - time.perf_counter()
+                        if delay > 0:
+                            time.sleep(delay)
+                    next_sample = max(next_sample + interval, time.perf_counter() - interval)
+
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                captured_at = time.perf_counter()
+                frame_index = stats["captured"]
+                stats["captured"] += 1
+
+                collect([future for future in pending if future.done()])
+                if len(pending) >= max_pending:
+                    # Drop the oldest frame still waiting for a worker; if all are running, drop this one
+                    stale = next((future for future in pending if future.cancel()), None)
+                    stats["dropped"] += 1
+                    if stale is None:
+                        continue
+                    collect([stale])
+
+                pending[pool.submit(_analyze_frame_job, frame_index, encode_frame(frame))] = (frame_index, captured_at)
+
+            collect(wait(list(pending)).done if pending else [])
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cap.release()
+
+    elapsed = time.perf_counter() - start
+    print("\n--- Sharaba Kavacham Stream Summary ---")
+    print(f"Frames captured: {stats['captured']}  analyzed: {stats['analyzed']}  dropped: {stats['dropped']}")
+    if elapsed > 0:
+        print(f"Achieved FPS: {stats['analyzed'] / elapsed:.2f} (capture {stats['captured'] / elapsed:.2f})")
+    if latencies:
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"Per-frame latency: p50={p50*1000:.1f}ms p95={p95*1000:.1f}ms max={latencies[-1]*1000:.1f}ms")
+    print("---------------------------------------")
+
+def _decode_image(path: str):
+    """
+    Decodes and resizes one image. Runs on a thread: OpenCV releases the GIL while it works.
+    """
+    preload()
+    image = cv2.imread(path, cv2.IMREAD_COLOR)
+    if image is None:
+        return None
+    return cv2.resize(image, MODEL_INPUT_SIZE, interpolation=cv2.INTER_AREA)
+
+def preprocess_batch(images: list) -> "np.ndarray":
+    """
+    Stacks same-sized BGR uint8 images and converts them to normalized RGB float32 in one pass.
+    """
+    preload()
+    batch = np.stack(images)                      # (N, H, W, 3) uint8, BGR
+    batch = batch[..., ::-1].astype(np.float32)   # BGR -> RGB for the whole batch
+    batch *= 1.0 / 255.0
+    batch -= np.asarray(NORMALIZE_MEAN, dtype=np.float32)
+    batch /= np.asarray(NORMALIZE_STD, dtype=np.float32)
+    return batch
+
+def _iter_image_batches(directory: str, batch_size: int):
+    """
+    Yields lists of at most `batch_size` image paths without listing the whole directory up front.
+    """
+    batch = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                batch.append(entry.path)
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+def analyze_directory(directory: str, batch_size: int, workers: int, output=None):
     """
-    Captures an image from the webcam, saves it, and analyzes it for emotions.
+    Analyzes every image in `directory` in batches and streams per-image results and a
+    per-emotion summary as JSONL. At most two batches (the one being analyzed and the one
+    being decoded) are held in memory at any time.
     """
-    # Initialize the webcam
-    cap = cv2.VideoCapture(0)
+    if not os.path.isdir(directory):
+        print(f"Error: '{directory}' is not a directory.", file=sys.stderr)
+        sys.exit(1)
+
+    output = output or sys.stdout
+    totals = {}
+    maxima = {}
+    counts = {"images": 0, "unreadable": 0}
+    start = time.perf_counter()
+
+    def write(record):
+        output.write(json.dumps(record) + "\n")
+
+    with ThreadPoolExecutor(max_workers=workers) as decoder:
+        batches = _iter_image_batches(directory, batch_size)
+        next_paths = next(batches, None)
+        next_decoded = decoder.map(_decode_image, next_paths) if next_paths else None
+        while next_paths:
+            paths, decoded = next_paths, list(next_decoded)
+            # Start decoding the following batch while this one is analyzed
+            next_paths = next(batches, None)
+            next_decoded = decoder.map(_decode_image, next_paths) if next_paths else None
+
+            readable = [(path, image) for path, image in zip(paths, decoded) if image is not None]
+            for path, image in zip(paths, decoded):
+                if image is None:
+                    counts["unreadable"] += 1
+                    write({"path": path, "error": "unreadable image"})
+            if not readable:
+                continue
+
+            results = score_emotions_batch(preprocess_batch([image for _, image in readable]))
+            for (path, _), emotions in zip(readable, results):
+                counts["images"] += 1
+                for emotion, score in emotions.items():
+                    totals[emotion] = totals.get(emotion, 0.0) + score
+                    maxima[emotion] = max(maxima.get(emotion, 0.0), score)
+                write({"path": path, "emotions": emotions})
+            output.flush()
+
+    summary = {
+        "summary": {
+            "images": counts["images"],
+            "unreadable": counts["unreadable"],
+            "mean": {emotion: total / counts["images"] for emotion, total in totals.items()} if counts["images"] else {},
+            "max": maxima,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+    }
+    write(summary)
+    output.flush()
+    return summary
+
+def capture_once(source: str):
+    """
+    Captures a single frame and analyzes it for emotions.
+    """
+    cap = open_source(source)
 
     if not cap.isOpened():
         print("Error: Could not open webcam.")
@@ -45,29 +322,52 @@ def main():
         print("Error: Could not read frame from webcam.")
         return
 
-    # Create a temporary file in a platform-agnostic way
-    temp_image_path = ""
-    try:
-        # Create a named temporary file, get its path, and then close it
-        # so that cv2.imwrite can open and write to it.
-        with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as temp_f:
-            temp_image_path = temp_f.name
+    # Analyze the image for emotions, encoded in memory
+    emotion_analysis = analyze_emotion(encode_frame(frame))
 
-        cv2.imwrite(temp_image_path, frame)
-        print(f"Image captured and saved to {temp_image_path}")
+    print("\n--- Sharaba Kavacham Analysis ---")
+    print(emotion_analysis)
+    print("---------------------------------")
 
-        # Analyze the image for emotions
-        emotion_analysis = analyze_emotion(temp_image_path)
+def main():
+    """
+    Captures images from the webcam (or a stand-in source) and analyzes them for emotions.
+    """
+    parser = argparse.ArgumentParser(description="Sharaba Kavacham emotion analysis.")
+    parser.add_argument("--source", default="0", help="Camera index, video file, image directory or glob (default: webcam 0).")
+    parser.add_argument("--continuous", action="store_true", help="Keep the source open and analyze frames continuously.")
+    parser.add_argument("--fps", type=float, default=2.0, help="Frames sampled per second in continuous mode (0 = as fast as possible).")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1), help="Analysis worker processes.")
+    parser.add_argument("--max-pending", type=int, default=None, help="Frames allowed to wait for analysis before stale ones are dropped (default: 2 per worker).")
+    parser.add_argument("--max-frames", type=int, default=None, help="Stop after capturing this many frames.")
+    parser.add_argument("--duration", type=float, default=None, help="Stop after this many seconds.")
+    parser.add_argument("--dir", default=None, help="Analyze every image in this directory instead of capturing.")
+    parser.add_argument("--batch-size", type=int, default=32, help="Images decoded and analyzed together in --dir mode; bounds peak memory.")
+    parser.add_argument("--output", default=None, help="JSONL file for --dir results (default: stdout).")
+    args = parser.parse_args()
+    preload()
 
-        print("\n--- Sharaba Kavacham Analysis ---")
-        print(emotion_analysis)
-        print("---------------------------------")
+    if args.dir:
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as output:
+                analyze_directory(args.dir, max(1, args.batch_size), max(1, args.workers), output)
+        else:
+            analyze_directory(args.dir, max(1, args.batch_size), max(1, args.workers))
+        return
 
-    finally:
-        # Clean up the temporary file
-        if temp_image_path and os.path.exists(temp_image_path):
-            os.remove(temp_image_path)
-            print(f"Temporary file {temp_image_path} removed.")
+    if not args.continuous:
+        capture_once(args.source)
+        return
+
+    workers = max(1, args.workers)
+    run_continuous(
+        args.source,
+        fps=args.fps,
+        workers=workers,
+        max_pending=args.max_pending or workers * 2,
+        max_frames=args.max_frames,
+        duration=args.duration,
+    )
 
 
 if __name__ == "__main__":
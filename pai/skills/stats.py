@@ -0,0 +1,114 @@
+import sys
+import json
+import math
+import argparse
+from ..event_index import parse_time, query_events
+
+# (event type, grouping field, metrics) reported by default
+REPORTS = (
+    ("SkillTiming", "skill", ("duration_ms", "spawn_ms", "first_output_ms", "relay_max_ms")),
+    ("LLMCall", "skill", ("duration_ms", "ttft_ms", "tokens_per_second")),
+    ("LLMCall", "model", ("duration_ms", "ttft_ms", "connect_ms", "queue_ms", "tokens_per_second")),
+)
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+def outcome(payload: dict) -> str:
+    """
+    How an event ended: "cached" for cache hits, else its status ("ok", "error", "cancelled").
+    Events without a status, such as SkillTiming, count as "ok".
+    """
+    if payload.get("cached"):
+        return "cached"
+    return payload.get("status") or "ok"
+
+def collect(event_type: str, group_field: str, metrics: tuple, since: int, until: int) -> dict:
+    """
+    Groups metric samples of one event type by a payload field. Only completed, uncached calls
+    contribute latency samples; cache hits, errors and cancelled hedges are only counted.
+    """
+    groups = {}
+    for line in query_events(event_type=event_type, since=since, until=until):
+        payload = json.loads(line).get("payload", {})
+        group = groups.setdefault(payload.get(group_field) or "(unknown)",
+                                  {"outcomes": {}, "samples": {metric: [] for metric in metrics}})
+        kind = outcome(payload)
+        group["outcomes"][kind] = group["outcomes"].get(kind, 0) + 1
+        if kind != "ok":
+            continue
+        for metric in metrics:
+            value = payload.get(metric)
+            if isinstance(value, (int, float)):
+                group["samples"][metric].append(value)
+    return groups
+
+def summarize(groups: dict) -> dict:
+    summary = {}
+    for group, collected in groups.items():
+        summary[group] = {"outcomes": collected["outcomes"], "metrics": {}}
+        for metric, values in collected["samples"].items():
+            values.sort()
+            summary[group]["metrics"][metric] = {
+                "count": len(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+            }
+    return summary
+
+def print_table(title: str, summary: dict):
+    print(f"\n{title}")
+    if not summary:
+        print("  (no events)")
+        return
+    print(f"  {'group':<28} {'metric':<18} {'n':>6} {'p50':>10} {'p95':>10} {'p99':>10}")
+    for group in sorted(summary):
+        for metric, stats in summary[group]["metrics"].items():
+            if not stats["count"]:
+                continue
+            values = [f"{stats[p]:>10.1f}" for p in ("p50", "p95", "p99")]
+            print(f"  {group:<28.28} {metric:<18} {stats['count']:>6} {' '.join(values)}")
+        outcomes = summary[group]["outcomes"]
+        if set(outcomes) - {"ok"}:
+            # Only "ok" events are in the percentiles above
+            counts = ", ".join(f"{count} {kind}" for kind, count in sorted(outcomes.items()))
+            print(f"  {group:<28.28} {'(events)':<18} {counts}")
+
+def main():
+    """
+    Reports latency percentiles per skill and per model from SkillTiming and LLMCall events.
+    """
+    parser = argparse.ArgumentParser(description="Show PAI latency statistics.")
+    parser.add_argument("--since", default="24h", help="Start of the window: epoch seconds, ISO date, or an age like 24h / 7d (default: 24h).")
+    parser.add_argument("--until", default=None, help="End of the window, in the same formats as --since.")
+    parser.add_argument("--json", action="store_true", help="Print the statistics as JSON.")
+    args = parser.parse_args()
+
+    try:
+        since = parse_time(args.since) if args.since else None
+        until = parse_time(args.until) if args.until else None
+    except ValueError as e:
+        print(f"Error: Invalid time filter: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    results = {}
+    for event_type, group_field, metrics in REPORTS:
+        title = f"{event_type} by {group_field}"
+        results[title] = summarize(collect(event_type, group_field, metrics, since, until))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for title, summary in results.items():
+        print_table(title, summary)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import os
+import sys
+import tempfile
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from pai.bench import importtime
+
+
+class ForbiddenImportsTest(unittest.TestCase):
+    """
+    Every entry point keeps the modules its budget forbids out of startup.
+    Unlike the millisecond budgets, which `python -m pai.bench.importtime` only warns about,
+    the set of loaded modules does not depend on the machine, so regressions fail here.
+    """
+    def test_entry_points_do_not_load_forbidden_modules(self):
+        budgets = importtime.load_budgets()
+        with tempfile.TemporaryDirectory(prefix='pai-importtime-') as pai_dir:
+            env = importtime.isolated_env(pai_dir)
+            for name, argv in importtime.ENTRY_POINTS.items():
+                with self.subTest(entry_point=name):
+                    modules = importtime.run_importtime(argv, env)["modules"]
+                    self.assertTrue(modules, f"{name} produced no -X importtime output")
+                    forbidden = budgets.get(name, {}).get("forbidden", [])
+                    self.assertEqual(importtime.forbidden_loaded(modules, forbidden), [])
+
+    def test_every_entry_point_has_a_budget(self):
+        self.assertEqual(sorted(importtime.load_budgets()), sorted(importtime.ENTRY_POINTS))
+
+
+if __name__ == "__main__":
+    unittest.main()